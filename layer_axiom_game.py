@@ -1,13 +1,38 @@
 #!/usr/bin/env python3
+import array
+import bz2
+import concurrent.futures
 import curses
+import gc
+import gzip
+import hashlib
+import io
+import json
 import logging
+import lzma
 import math
+import multiprocessing
+import os
+import plotly
 import plotly.graph_objects as go
+import queue
 import sys
 import random
+import re
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
 
 LOG_FILENAME = "layer_axiom_game.log"
 OUTPUT_FILENAME = "matrix_visualization.html"
+RENDER_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                "layer_axiom_game", "renders")
+RENDER_CACHE_BYTES = 512 << 20   # evict least recently used renders past this size
+RENDER_CACHE = True              # --no-render-cache turns it off
 
 logging.basicConfig(
     filename=LOG_FILENAME,
@@ -39,21 +64,83 @@ AXIOM_CONFIGS = {
     'J': {'color': 'black',  'label': 'J (Diagonal plane -Y3)', 'opacity': 1},
 }
 
+AXIOMS = list(AXIOM_CONFIGS)
+
 LAYER0_OPACITY = 1
 LAYER1_OPACITY = 1
 
 # These can be overridden via CLI:
 PREFILL = False
 FILL_MODE = "full"  # "full", "partial", or "random"
+SEED = 0            # prefill seed
+SAMPLING = "uniform"  # how partial/random pick cells: uniform, stratified, bluenoise, hash
+LAYERS = None       # number of layers to prefill; default: longest fill list
+WORKERS = 1         # prefill worker processes
+LOAD_WORKERS = None # worker processes for loading big saves; default: one per CPU
+SAVE_FORMAT = 2     # save file format: 1 (full grids), 2 (rings only), "binary" or "sqlite"
+COMPRESSION = None  # compress saves with "gzip", "bz2" or "lzma"; default: by file extension
+RULE = None         # ring rule spec, e.g. "30" or "T:2,3/B,C" (see RingRule)
+RULE_CHAR = None    # char for cells a rule brings alive; default: inherit
+RULE_BASE = 1       # at start-up, rules grow layers above this one...
+RULE_LAYERS = None  # ...up to this layer
 SHAPE = "circle"    # "circle", "square", "polygon:N"
 
 # Holds each layer’s data; keys: (layer, axiom) => (grid, read_only)
 data = {}
 
+# (layer, axiom) blocks created or modified since the last save or load
+dirty_blocks = set()
+
+# Save file `data` was loaded from or last saved to; dirty_blocks is relative to it
+saved_path = None
+
+# Saves written since the last load; keys: filename => (format, compression, world_changes, file_stamp())
+saved_worlds = {}
+world_changes = 0   # bumped by every block change (see forget_hash)
+
+# Total grid cells held in `data`, kept up to date by put_block
+cells_held = 0
+
+# Lowest layer edited since the ring rules last ran (None = nothing pending)
+rule_floor = None
+
+# Ring position caches; keys: layer => [(x, y), ...] / {(x, y): ring_index}
+ring_position_cache = {}
+ring_index_cache = {}
+
+# Inverted character index; keys: ch => {(layer, axiom): {ring_index, ...}}
+char_index = {}
+
+# Per-ring 3D points; keys: (layer, axiom) => (shape, (xs, ys, zs, texts))
+ring_geometry_cache = {}
+
+# About `budget` of those points, for the ASCII preview; keys: (layer, axiom) => (shape, budget, points)
+preview_points_cache = {}
+
+# Content hashes (see block_hash), dropped when a block changes and rebuilt on demand;
+# keys: (layer, axiom) => digest / axiom => digest over its blocks, bottom-up
+block_hashes = {}
+axiom_hashes = {}
+grid_hashed = set()   # blocks whose interior was set other than by inheriting it
+
+# Last render_3d per output file; keys: filename => (render_key(), file_stamp())
+rendered = {}
+
+# Live ASCII preview panel (toggled with Ctrl+E or --preview)
+PREVIEW_WIDTH = 48
+PREVIEW_HEIGHT = 22
+PREVIEW_TILT = 0.45       # camera elevation, radians
+PREVIEW_SPIN = 0.12       # camera turn per frame, radians
+PREVIEW_FRAME_MS = 120    # redraw interval while the preview is shown
+preview_enabled = False
+preview_angle = 0.0
+
 # Current “game state” for curses
 current_layer = 0
 current_axiom = 'A'
 cursor_x, cursor_y = 0, 0
+arc_mark = None          # ring index set with Ctrl+K, used by Ctrl+A
+status_message = ""      # feedback line shown under the help text
 
 # Example default fill patterns (each is a list of strings):
 FILLS = {
@@ -76,58 +163,389 @@ def layer_dimension(layer):
 
 def create_layer_axiom(layer, axiom):
     dim = layer_dimension(layer)
-    grid = [[DEFAULT_CHAR for _ in range(dim)] for _ in range(dim)]
-    read_only = [[False for _ in range(dim)] for _ in range(dim)]
 
     if layer == 0:
-        grid[0][0] = CENTER_CHAR
-        read_only[0][0] = False
+        grid = [[CENTER_CHAR]]
+        read_only = [[False]]
     else:
-        # Inherit data from the previous layer
+        # Inherit data from the previous layer, a whole row at a time
         ensure_layer_axiom(layer - 1, axiom)
         prev_grid, prev_read_only = data[(layer - 1, axiom)]
         prev_dim = layer_dimension(layer - 1)
         offset = (dim - prev_dim) // 2
-
-        for py in range(prev_dim):
-            for px in range(prev_dim):
-                ch = prev_grid[py][px]
-                # If it's the center char, replace with space
-                if ch == CENTER_CHAR:
-                    ch = ' '
-                grid[py + offset][px + offset] = ch
-                read_only[py + offset][px + offset] = True
-
-    data[(layer, axiom)] = (grid, read_only)
+        edge = [DEFAULT_CHAR] * offset
+        ro_row = [False] * offset + [True] * prev_dim + [False] * offset
+
+        grid = [[DEFAULT_CHAR] * dim for _ in range(offset)]
+        for prev_row in prev_grid:
+            # If it's the center char, replace with space
+            if CENTER_CHAR in prev_row:
+                prev_row = [' ' if ch == CENTER_CHAR else ch for ch in prev_row]
+            grid.append(edge + prev_row + edge)
+        grid += [[DEFAULT_CHAR] * dim for _ in range(offset)]
+
+        read_only = [[False] * dim for _ in range(offset)]
+        read_only += [ro_row[:] for _ in range(prev_dim)]
+        read_only += [[False] * dim for _ in range(offset)]
+
+    put_block(layer, axiom, grid, read_only)
+    dirty_blocks.add((layer, axiom))
+    journal_record({'op': 'create', 'layer': layer, 'axiom': axiom})
+
+def put_block(layer, axiom, grid, read_only):
+    """
+    Store a freshly built or loaded grid in `data` and refresh what depends on it.
+    """
+    global cells_held
+    key = (layer, axiom)
+    if key in data:
+        unindex_block(layer, axiom)
+    else:
+        cells_held += len(grid) * len(grid)
+    data[key] = (grid, read_only)
+    ring_geometry_cache.pop(key, None)
+    preview_points_cache.pop(key, None)
+    grid_hashed.discard(key)
+    forget_hash(layer, axiom)
+    index_block(layer, axiom)
+
+def clear_data():
+    global cells_held
+    data.clear()
+    ring_geometry_cache.clear()
+    preview_points_cache.clear()
+    char_index.clear()
+    dirty_blocks.clear()
+    block_hashes.clear()
+    axiom_hashes.clear()
+    grid_hashed.clear()
+    saved_worlds.clear()
+    cells_held = 0
 
 def ensure_layer_axiom(layer, axiom):
     if (layer, axiom) not in data:
-        create_layer_axiom(layer, axiom)
+        if lazy_source is not None and (layer, axiom) in lazy_source:
+            load_lazy_block(layer, axiom)
+        else:
+            create_layer_axiom(layer, axiom)
 
 def get_outer_ring_cells(layer, axiom):
     """
-    Return all non-empty (x,y,ch) in the outer ring,
-    skipping ' ', '', or DEFAULT_CHAR.
+    Return all non-empty (x,y,ch) in the outer ring, in ring_positions
+    order, skipping ' ', '', or DEFAULT_CHAR. Walks only the 8N ring cells.
     """
     grid, ro = data[(layer, axiom)]
-    dim = layer_dimension(layer)
-    center = layer
     if layer == 0:
         ch = grid[0][0]
         return [(0, 0, ch)]
-    ring = []
+    return [(x, y, grid[y + layer][x + layer]) for x, y in ring_positions(layer)
+            if grid[y + layer][x + layer] not in (' ', '', DEFAULT_CHAR)]
+
+def ring_length(layer):
+    return 1 if layer == 0 else 8 * layer
+
+def ring_positions(layer):
+    """
+    Return the (x, y) offsets of the outer ring of `layer` in the stable
+    perimeter order (sorted by angle, the same order render_3d uses).
+    """
+    positions = ring_position_cache.get(layer)
+    if positions is None:
+        N = layer
+        if N == 0:
+            positions = [(0, 0)]
+        else:
+            positions = [(x, -N) for x in range(-N, N + 1)]
+            positions += [(x, N) for x in range(-N, N + 1)]
+            positions += [(-N, y) for y in range(-N + 1, N)]
+            positions += [(N, y) for y in range(-N + 1, N)]
+            positions.sort(key=lambda p: math.atan2(p[1], p[0]))
+        ring_position_cache[layer] = positions
+        ring_index_cache[layer] = {p: i for i, p in enumerate(positions)}
+    return positions
+
+def ring_index(layer, x, y):
+    """
+    Ring index of offset (x, y) on `layer`, or None if it is not on the ring.
+    """
+    ring_positions(layer)
+    return ring_index_cache[layer].get((x, y))
+
+def ring_edges(layer):
+    """
+    Ring indices laid out along the grid edges of `layer`, for building rows
+    straight from a ring: (top, bottom, left, right) where top/bottom cover a
+    full row left to right and left/right cover the rows in between.
+    """
     N = layer
-    for y in range(-N, N + 1):
-        for x in range(-N, N + 1):
-            if max(abs(x), abs(y)) == N:
-                gx = x + center
-                gy = y + center
-                ch = grid[gy][gx]
-                # skip if it's default or blank
-                if ch in [' ', '', DEFAULT_CHAR]:
-                    continue
-                ring.append((x, y, ch))
-    return ring
+    ring_positions(layer)
+    lookup = ring_index_cache[layer]
+    top = [lookup[(x, -N)] for x in range(-N, N + 1)]
+    bottom = [lookup[(x, N)] for x in range(-N, N + 1)]
+    left = [lookup[(-N, y)] for y in range(-N + 1, N)]
+    right = [lookup[(N, y)] for y in range(-N + 1, N)]
+    return top, bottom, left, right
+
+def wrap_rows(prev_rows, ring, layer):
+    """
+    Build the rows (strings) of `layer` from the rows of the layer below and
+    this layer's ring, applying the same inheritance as create_layer_axiom.
+    """
+    top, bottom, left, right = ring_edges(layer)
+    rows = ["".join([ring[i] for i in top])]
+    for prev_row, li, ri in zip(prev_rows, left, right):
+        rows.append(ring[li] + prev_row.replace(CENTER_CHAR, ' ') + ring[ri])
+    rows.append("".join([ring[i] for i in bottom]))
+    return rows
+
+def ring_rows(prev_rows, ring, layer):
+    """
+    wrap_rows, also covering layer 0 (whose one-cell ring is the whole grid).
+    """
+    return ["".join(ring)] if layer == 0 else wrap_rows(prev_rows, ring, layer)
+
+def mark_dirty(layer, axiom):
+    global rule_floor
+    dirty_blocks.add((layer, axiom))
+    if rule_floor is None or layer < rule_floor:
+        rule_floor = layer
+    ring_geometry_cache.pop((layer, axiom), None)
+    preview_points_cache.pop((layer, axiom), None)
+    forget_hash(layer, axiom)
+
+def forget_hash(layer, axiom):
+    global world_changes
+    block_hashes.pop((layer, axiom), None)
+    axiom_hashes.pop(axiom, None)
+    world_changes += 1
+
+def block_hash(layer, axiom):
+    """
+    Digest of the ring of (layer, axiom). Its interior normally repeats the
+    layer below, which that layer's hash already covers; blocks whose
+    interior was written any other way are hashed whole.
+    """
+    key = (layer, axiom)
+    digest = block_hashes.get(key)
+    if digest is None:
+        if key in grid_hashed:
+            digest = cells_digest('LAYER', "".join(["".join(row) for row in data[key][0]]))
+        else:
+            digest = cells_digest('RING', "".join(read_ring(layer, axiom)))
+        block_hashes[key] = digest
+    return digest
+
+def cells_digest(kind, cells):
+    """
+    Digest of a block's cells: the ring in ring_positions order for 'RING',
+    the whole grid row-major for 'LAYER'. block_hash uses it, and saves
+    store it in their index for each block.
+    """
+    prefix = "R" if kind == 'RING' else "G"
+    return hashlib.blake2b((prefix + cells).encode('utf-8'), digest_size=16).digest()
+
+def saved_digest(layer, axiom, kind):
+    """
+    block_hash of (layer, axiom) if it covers what a `kind` block of it
+    stores, else None (the writer hashes the cells itself).
+    """
+    if (kind == 'LAYER') == ((layer, axiom) in grid_hashed):
+        return block_hash(layer, axiom)
+    return None
+
+def axiom_hash(axiom):
+    """
+    Digest over the block hashes of one axiom, layer by layer. Only the
+    blocks changed since the last call are rehashed.
+    """
+    digest = axiom_hashes.get(axiom)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        for layer in sorted(layer for layer, a in data if a == axiom):
+            h.update(layer.to_bytes(4, 'little'))
+            h.update(block_hash(layer, axiom))
+        digest = axiom_hashes[axiom] = h.digest()
+    return digest
+
+def world_hash():
+    """
+    Hex digest of the whole world, rolled up from the axiom hashes.
+    """
+    materialize()
+    h = hashlib.blake2b(digest_size=16)
+    for axiom in AXIOMS:
+        h.update(axiom_hash(axiom))
+    return h.hexdigest()
+
+def file_stamp(filename):
+    """
+    (mtime, size) of `filename` and of its SQLite WAL, None if missing;
+    tells whether a file changed since it was written.
+    """
+    stamp = []
+    for path in (filename, filename + '-wal'):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+def write_cells(layer, axiom, cells):
+    """
+    Write (gx, gy, ch) grid updates to (layer, axiom). Ring cells go through
+    write_ring; anything else (only possible on oddly shaped loaded grids)
+    is written directly. Returns the number of cells written.
+    """
+    grid, read_only = data[(layer, axiom)]
+    ring_positions(layer)
+    ring_lookup = ring_index_cache[layer]
+    ring_updates = []
+    direct = []
+    for gx, gy, ch in cells:
+        pos = ring_lookup.get((gx - layer, gy - layer))
+        if pos is not None:
+            ring_updates.append((pos, ch))
+        elif not read_only[gy][gx]:
+            grid[gy][gx] = ch
+            direct.append((gx, gy, ch))
+    written = len(direct)
+    if written:
+        grid_hashed.add((layer, axiom))
+        mark_dirty(layer, axiom)
+        journal_record({'op': 'cells', 'layer': layer, 'axiom': axiom, 'cells': direct})
+    return written + write_ring(layer, axiom, ring_updates)
+
+def write_ring(layer, axiom, updates):
+    """
+    Single write path for ring edits: apply (ring_index, ch) updates to
+    (layer, axiom), skipping read-only cells, update the character index in
+    bulk and mark the block dirty once. Returns the number of cells written.
+    """
+    ensure_layer_axiom(layer, axiom)
+    grid, read_only = data[(layer, axiom)]
+    positions = ring_positions(layer)
+    removed, added = {}, {}
+    written = 0
+    logged = [] if journal is not None else None
+    for i, ch in updates:
+        x, y = positions[i]
+        gx, gy = x + layer, y + layer
+        if read_only[gy][gx]:
+            continue
+        written += 1
+        if logged is not None:
+            logged.append((i, ch))
+        old = grid[gy][gx]
+        if old != ch:
+            grid[gy][gx] = ch
+            removed.setdefault(old, []).append(i)
+            added.setdefault(ch, []).append(i)
+    for ch, changed in removed.items():
+        unindex_positions(ch, layer, axiom, changed)
+    for ch, changed in added.items():
+        index_positions(ch, layer, axiom, changed)
+    if written:
+        mark_dirty(layer, axiom)
+        if logged:
+            journal_record({'op': 'ring', 'layer': layer, 'axiom': axiom, 'cells': logged})
+    return written
+
+def read_ring(layer, axiom):
+    """
+    The ring of (layer, axiom) as a list of chars, in ring_positions order.
+    """
+    grid, _ = data[(layer, axiom)]
+    return [grid[y + layer][x + layer] for (x, y) in ring_positions(layer)]
+
+def index_positions(ch, layer, axiom, positions):
+    if ch in (' ', '', DEFAULT_CHAR):
+        return
+    char_index.setdefault(ch, {}).setdefault((layer, axiom), set()).update(positions)
+
+def unindex_positions(ch, layer, axiom, positions):
+    blocks = char_index.get(ch)
+    if not blocks:
+        return
+    indexed = blocks.get((layer, axiom))
+    if indexed is None:
+        return
+    indexed.difference_update(positions)
+    if not indexed:
+        del blocks[(layer, axiom)]
+        if not blocks:
+            del char_index[ch]
+
+def ring_char_positions(layer, axiom):
+    """
+    Group the ring of (layer, axiom) by character: {ch: [ring_index, ...]}.
+    """
+    groups = {}
+    for i, ch in enumerate(read_ring(layer, axiom)):
+        if ch != DEFAULT_CHAR:
+            groups.setdefault(ch, []).append(i)
+    return groups
+
+def index_block(layer, axiom):
+    """
+    Add every ring cell of (layer, axiom) to the character index.
+    """
+    for ch, positions in ring_char_positions(layer, axiom).items():
+        index_positions(ch, layer, axiom, positions)
+
+def unindex_block(layer, axiom):
+    for ch, positions in ring_char_positions(layer, axiom).items():
+        unindex_positions(ch, layer, axiom, positions)
+
+def find_char(ch, limit=None):
+    """
+    Return the (layer, axiom, ring_index) entries holding `ch`, ordered by
+    layer, axiom and ring position. Only the blocks needed to reach `limit`
+    have their positions sorted.
+    """
+    materialize()
+    blocks = char_index.get(ch)
+    if not blocks:
+        return []
+    matches = []
+    for key in sorted(blocks):
+        for pos in sorted(blocks[key]):
+            matches.append((key[0], key[1], pos))
+        if limit is not None and len(matches) >= limit:
+            return matches[:limit]
+    return matches
+
+def count_char(ch):
+    materialize()
+    return sum(len(positions) for positions in char_index.get(ch, {}).values())
+
+def arc_indices(layer, start, end):
+    """
+    Ring indices from `start` to `end` inclusive, walking forward and
+    wrapping around the ring if needed.
+    """
+    n = ring_length(layer)
+    start %= n
+    count = (end - start) % n + 1
+    return [(start + k) % n for k in range(count)]
+
+def fill_ring(layer, axiom, ch):
+    return write_ring(layer, axiom, ((i, ch) for i in range(ring_length(layer))))
+
+def fill_arc(layer, axiom, start, end, ch):
+    return write_ring(layer, axiom, ((i, ch) for i in arc_indices(layer, start, end)))
+
+def stamp_pattern(layer, axiom, pattern, start=0):
+    """
+    Repeat `pattern` along the whole ring, beginning at ring index `start`.
+    """
+    if not pattern:
+        return 0
+    n = ring_length(layer)
+    return write_ring(layer, axiom, (
+        ((start + k) % n, pattern[k % len(pattern)]) for k in range(n)
+    ))
 
 # ---------------------------------------------------------------------
 # 2) 3D RENDERING
@@ -200,11 +618,212 @@ def calculate_coordinates(axiom, shape, layer, fraction):
         return (-y2d*factor, y2d*factor, x2d)
     return (0, 0, 0)
 
+def ring_geometry(layer, axiom):
+    """
+    3D points of the non-empty ring cells of (layer, axiom), as
+    (x_vals, y_vals, z_vals, text_vals) sorted by angle. Cached per ring and
+    shared by render_3d and the ASCII preview; edits invalidate only their ring.
+    """
+    key = (layer, axiom)
+    cached = ring_geometry_cache.get(key)
+    if cached is not None and cached[0] == SHAPE:
+        return cached[1]
+
+    # already sorted by angle, as ring_positions is
+    ring_cells = get_outer_ring_cells(layer, axiom)
+    x_vals, y_vals, z_vals, text_vals = [], [], [], []
+    for i, (ox, oy, ch) in enumerate(ring_cells):
+        fraction = i / len(ring_cells)
+        x, y, z = calculate_coordinates(axiom, SHAPE, layer, fraction)
+        x_vals.append(x)
+        y_vals.append(y)
+        z_vals.append(z)
+        text_vals.append(ch)
+
+    geometry = (x_vals, y_vals, z_vals, text_vals)
+    ring_geometry_cache[key] = (SHAPE, geometry)
+    return geometry
+
+def preview_points(layer, axiom, budget):
+    """
+    About `budget` evenly spaced points of ring_geometry(layer, axiom), as
+    (x, y, z, ch). Only those points are computed (unless the full
+    geometry is already cached), so a first frame over hundreds of layers
+    does not build every ring's geometry.
+    """
+    key = (layer, axiom)
+    cached = ring_geometry_cache.get(key)
+    if cached is not None and cached[0] == SHAPE:
+        xs, ys, zs, texts = cached[1]
+        step = max(1, len(xs) // budget)
+        return list(zip(xs[::step], ys[::step], zs[::step], texts[::step]))
+    cached = preview_points_cache.get(key)
+    if cached is not None and cached[:2] == (SHAPE, budget):
+        return cached[2]
+    texts = [ch for _, _, ch in get_outer_ring_cells(layer, axiom)]
+    step = max(1, len(texts) // budget)
+    points = [calculate_coordinates(axiom, SHAPE, layer, i / len(texts)) + (texts[i],)
+              for i in range(0, len(texts), step)]
+    preview_points_cache[key] = (SHAPE, budget, points)
+    return points
+
+def render_ascii_preview(width, height, angle):
+    """
+    Project every ring into a width x height character raster, seen by an
+    orthographic camera turned `angle` radians around the Z axis.
+    Rings and layers are decimated to roughly one sample per raster cell.
+    """
+    materialize()
+    raster = [[' '] * width for _ in range(height)]
+    if not data or width < 2 or height < 2:
+        return ["".join(row) for row in raster]
+    depth = [[math.inf] * width for _ in range(height)]
+
+    max_layer = max(layer for (layer, _) in data.keys()) or 1
+    extent = max_layer * math.sqrt(2)
+    sx_scale = (width - 1) / (2 * extent)
+    sy_scale = (height - 1) / (2 * extent)
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    ca, sa = math.cos(angle), math.sin(angle)
+    ct, st = math.cos(PREVIEW_TILT), math.sin(PREVIEW_TILT)
+    layer_step = max(1, math.ceil(max_layer / height))
+
+    for (layer, axiom) in list(data.keys()):
+        if layer % layer_step and layer != max_layer:
+            continue
+        budget = int(2 * math.pi * layer * sx_scale) + 1
+        for x, y, z, ch in preview_points(layer, axiom, budget):
+            rx = x * ca - y * sa
+            ry = x * sa + y * ca
+            d = ry * ct - z * st
+            rz = ry * st + z * ct
+            col = int(cx + rx * sx_scale + 0.5)
+            row = int(cy - rz * sy_scale + 0.5)
+            if 0 <= col < width and 0 <= row < height and d < depth[row][col]:
+                depth[row][col] = d
+                raster[row][col] = ch
+    return ["".join(row) for row in raster]
+
+# Render cache: every HTML export is also stored in RENDER_CACHE_DIR as
+# <render_key>.html, so rendering a world, shape and settings that any
+# earlier run already rendered is a file copy. Entries are evicted least
+# recently used first once they add up to more than RENDER_CACHE_BYTES;
+# stats.json counts hits and misses.
+def render_key():
+    """
+    Hex digest of everything render_3d draws: the world, SHAPE, the
+    visualization settings and the plotly version.
+    """
+    config = repr((SHAPE, AXIOM_CONFIGS, LAYER_VISUALIZATION_MODES, LAYER0_OPACITY, LAYER1_OPACITY,
+                   plotly.__version__))
+    return hashlib.blake2b((world_hash() + config).encode('utf-8'), digest_size=16).hexdigest()
+
+def render_cache_path(key):
+    return os.path.join(RENDER_CACHE_DIR, key + ".html")
+
+def count_render_cache(outcome):
+    path = os.path.join(RENDER_CACHE_DIR, "stats.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = {}
+    stats[outcome] = stats.get(outcome, 0) + 1
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+    os.replace(path + ".tmp", path)
+
+def render_cache_get(key, filename):
+    """
+    Copy the cached render for `key` to `filename`; False if there is none.
+    """
+    path = render_cache_path(key)
+    try:
+        shutil.copyfile(path, filename)
+    except FileNotFoundError:
+        count_render_cache('misses')
+        return False
+    os.utime(path)    # mark it recently used
+    count_render_cache('hits')
+    return True
+
+def render_cache_put(key, filename):
+    path = render_cache_path(key)
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    shutil.copyfile(filename, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    evict_render_cache()
+
+def render_cache_entries():
+    """
+    [(last used, bytes, path)] of the cached renders, oldest first.
+    """
+    entries = []
+    try:
+        names = os.listdir(RENDER_CACHE_DIR)
+    except FileNotFoundError:
+        return entries
+    for name in names:
+        if name.endswith(".html"):
+            path = os.path.join(RENDER_CACHE_DIR, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue    # evicted by another process meanwhile
+            entries.append((st.st_mtime, st.st_size, path))
+    return sorted(entries)
+
+def evict_render_cache(limit=None):
+    """
+    Delete the least recently used renders until the cache fits in `limit`
+    bytes (RENDER_CACHE_BYTES). Returns the number deleted.
+    """
+    limit = RENDER_CACHE_BYTES if limit is None else limit
+    entries = render_cache_entries()
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    return evicted
+
+def render_cache_stats():
+    """
+    {'entries', 'bytes', 'limit', 'hits', 'misses'} of the render cache.
+    """
+    entries = render_cache_entries()
+    stats = {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+             'limit': RENDER_CACHE_BYTES, 'hits': 0, 'misses': 0}
+    try:
+        with open(os.path.join(RENDER_CACHE_DIR, "stats.json"), 'r', encoding='utf-8') as f:
+            stats.update({k: v for k, v in json.load(f).items() if k in ('hits', 'misses')})
+    except (OSError, ValueError):
+        pass
+    return stats
+
 def render_3d(filename=OUTPUT_FILENAME):
     """
     Create a 3D scatter trace for each layer & axiom’s ring,
-    then write it to HTML.
+    then write it to HTML. Does nothing if `filename` already holds this
+    render (same render_key and untouched since), and copies the render
+    cache's copy if it has one.
     """
+    materialize()
+    key = render_key()
+    if rendered.get(filename) == (key, file_stamp(filename)):
+        print(f"Visualization in {filename} is up to date.")
+        return
+    if data and RENDER_CACHE and render_cache_get(key, filename):
+        rendered[filename] = (key, file_stamp(filename))
+        print(f"Visualization saved to {filename} (cached).")
+        return
     layer_0_trace = {axiom: {'x': [], 'y': [], 'z': [], 'text': []} for axiom in AXIOM_CONFIGS}
     layer_1_trace = {axiom: {'x': [], 'y': [], 'z': [], 'text': []} for axiom in AXIOM_CONFIGS}
     layer_1_plus_traces = []
@@ -218,22 +837,11 @@ def render_3d(filename=OUTPUT_FILENAME):
     max_layer = max(layer for (layer, _) in data.keys())
 
     for (layer, axiom) in data.keys():
-        ring_cells = get_outer_ring_cells(layer, axiom)
-        if not ring_cells:
+        xs, ys, zs, texts = ring_geometry(layer, axiom)
+        if not xs:
             continue
 
-        # sort ring points by angle
-        ring_cells.sort(key=lambda c: math.atan2(c[1], c[0]))
-        x_vals, y_vals, z_vals, text_vals = [], [], [], []
-
-        for i, (ox, oy, ch) in enumerate(ring_cells):
-            fraction = i / len(ring_cells)
-            x, y, z = calculate_coordinates(axiom, SHAPE, layer, fraction)
-            x_vals.append(x)
-            y_vals.append(y)
-            z_vals.append(z)
-            text_vals.append(ch)
-
+        x_vals, y_vals, z_vals, text_vals = list(xs), list(ys), list(zs), list(texts)
         if len(x_vals) > 1:
             # close the loop visually
             x_vals.append(x_vals[0])
@@ -317,6 +925,9 @@ def render_3d(filename=OUTPUT_FILENAME):
         width=1000, height=800
     )
     fig.write_html(filename)
+    rendered[filename] = (key, file_stamp(filename))
+    if RENDER_CACHE:
+        render_cache_put(key, filename)
     print(f"Visualization saved to {filename}.")
 
 # ---------------------------------------------------------------------
@@ -348,26 +959,199 @@ def move_cursor(dx, dy):
     jump_across(dx, dy)
 
 def insert_char(ch):
-    grid, read_only = data[(current_layer, current_axiom)]
     center = current_layer
     gx = cursor_x + center
     gy = cursor_y + center
-    if not read_only[gy][gx]:
-        grid[gy][gx] = ch
+    write_cells(current_layer, current_axiom, [(gx, gy, ch)])
+
+def cursor_ring_index():
+    return ring_index(current_layer, cursor_x, cursor_y)
 
-def go_to_layer_axiom(layer, axiom):
-    global current_layer, current_axiom, cursor_x, cursor_y
+def go_to_layer_axiom(layer, axiom, x=None, y=None):
+    global current_layer, current_axiom, cursor_x, cursor_y, arc_mark
     current_layer = layer
     current_axiom = axiom
     ensure_layer_axiom(current_layer, current_axiom)
-    cursor_x, cursor_y = -current_layer, -current_layer
+    prefetch_around(current_layer, current_axiom)
+    if x is None or y is None:
+        x, y = -current_layer, -current_layer
+    cursor_x, cursor_y = x, y
+    arc_mark = None
+
+def prompt_input(stdscr, label):
+    """
+    Read a line of printable characters on the status line.
+    Enter confirms, Esc cancels (returns None).
+    """
+    text = ""
+    while True:
+        stdscr.move(STATUS_LINE, 0)
+        stdscr.clrtoeol()
+        stdscr.addstr(STATUS_LINE, 0, f"{label}{text}")
+        stdscr.refresh()
+        key = stdscr.getch()
+        if key in (10, 13, curses.KEY_ENTER):
+            return text
+        if key in (27, 4):   # Esc, Ctrl+D
+            return None
+        if key in (curses.KEY_BACKSPACE, 127, 8):
+            text = text[:-1]
+        elif 32 <= key < 127:
+            text += chr(key)
+
+def bulk_fill_ring(stdscr):
+    global status_message
+    text = prompt_input(stdscr, "Fill ring with: ")
+    if text:
+        n = fill_ring(current_layer, current_axiom, text[0])
+        status_message = f"Filled {n} cells with '{text[0]}'."
+
+def set_arc_mark():
+    global arc_mark, status_message
+    arc_mark = cursor_ring_index()
+    status_message = f"Arc start marked at ring position {arc_mark}."
+
+def bulk_fill_arc(stdscr):
+    global status_message
+    end = cursor_ring_index()
+    if arc_mark is None or end is None:
+        status_message = "Mark an arc start with Ctrl+K first."
+        return
+    text = prompt_input(stdscr, f"Fill arc {arc_mark}..{end} with: ")
+    if text:
+        n = fill_arc(current_layer, current_axiom, arc_mark, end, text[0])
+        status_message = f"Filled {n} cells with '{text[0]}'."
+
+def bulk_stamp_pattern(stdscr):
+    global status_message
+    text = prompt_input(stdscr, "Stamp pattern: ")
+    if text:
+        start = cursor_ring_index() or 0
+        n = stamp_pattern(current_layer, current_axiom, text, start)
+        status_message = f"Stamped '{text}' over {n} cells."
+
+STATUS_LINE = 4
+
+SEARCH_LIMIT = 1000
+search_matches = []
+search_pos = 0
+search_total = 0   # all cells holding the searched char; search_matches stops at SEARCH_LIMIT
+
+def go_to_match(i):
+    global search_pos, status_message
+    search_pos = i % len(search_matches)
+    layer, axiom, pos = search_matches[search_pos]
+    x, y = ring_positions(layer)[pos]
+    go_to_layer_axiom(layer, axiom, x, y)
+    shown = len(search_matches)
+    total = f"{shown}" if shown == search_total else f"{shown} shown of {search_total}"
+    status_message = (f"Match {search_pos + 1}/{total}: "
+                      f"layer {layer}, axiom {axiom}, ring position {pos} (Ctrl+N=next, Ctrl+B=previous)")
+
+def search_char(stdscr):
+    global search_matches, search_total, status_message
+    text = prompt_input(stdscr, "Find char: ")
+    if not text:
+        return
+    search_matches = find_char(text[0], limit=SEARCH_LIMIT)
+    search_total = count_char(text[0])
+    if not search_matches:
+        status_message = f"'{text[0]}' not found."
+        return
+    go_to_match(0)
+
+def next_match():
+    if search_matches:
+        go_to_match(search_pos + 1)
+
+def previous_match():
+    if search_matches:
+        go_to_match(search_pos - 1)
+
+HUD_SAMPLES = 240
+hud_enabled = False
+hud_live = True   # False in headless replays, whose screens must not depend on timing
+frame_times = deque(maxlen=HUD_SAMPLES)   # seconds from key press to finished draw
+
+def resident_memory():
+    """
+    Resident set size in bytes, or None if the platform does not expose it.
+    Reads /proc on Linux; elsewhere falls back to the peak from getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def hud_line():
+    if not hud_live:
+        # the latency and memory readings differ from run to run
+        return f"key->draw -- | grids={len(data)} cells={cells_held} | rss=--"
+    if frame_times:
+        samples = sorted(frame_times)
+        p50 = samples[len(samples) // 2] * 1000
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+        latency = f"key->draw {frame_times[-1]*1000:.1f}ms p50={p50:.1f} p99={p99:.1f}"
+    else:
+        latency = "key->draw n/a"
+    rss = resident_memory()
+    rss_str = f"{rss / (1024 * 1024):.1f}MB" if rss is not None else "n/a"
+    return f"{latency} | grids={len(data)} cells={cells_held} | rss={rss_str}"
+
+def toggle_hud():
+    global hud_enabled, status_message
+    hud_enabled = not hud_enabled
+    status_message = "HUD on." if hud_enabled else "HUD off."
+
+def apply_ring_rules():
+    """
+    Ctrl+R: recompute the layers above the lowest edited layer (or above the
+    current layer if nothing changed) with the configured ring rule.
+    """
+    global status_message
+    if RULE is None:
+        status_message = "No ring rule configured (use --rule=...)."
+        return
+    materialize()
+    base = rule_floor if rule_floor is not None else current_layer
+    top = max(RULE_LAYERS or 0, max(layer for (layer, _) in data.keys()))
+    n = run_rules(RingRule(RULE, RULE_CHAR), base, top)
+    status_message = f"Ring rule {RULE}: layers {base + 1}..{top} recomputed, {n} cells changed."
+
+def draw_preview(stdscr, top, left):
+    """
+    Draw the preview panel at (top, left); returns the rows it took.
+    """
+    global preview_angle
+    max_y, max_x = stdscr.getmaxyx()
+    width = min(PREVIEW_WIDTH, max_x - left - 1)
+    height = min(PREVIEW_HEIGHT, max_y - top - 1)
+    if width < 8 or height < 4:
+        return 0
+    for i, row_str in enumerate(render_ascii_preview(width, height, preview_angle)):
+        stdscr.addstr(top + i, left, row_str)
+    preview_angle = (preview_angle + PREVIEW_SPIN) % (2 * math.pi)
+    return height
+
+def toggle_preview():
+    global preview_enabled, status_message
+    preview_enabled = not preview_enabled
+    status_message = "3D preview on." if preview_enabled else "3D preview off."
 
 def draw_interface(stdscr):
-    stdscr.clear()
+    stdscr.erase()
     stdscr.addstr(0, 0, f"Layer: {current_layer}, Axiom: {current_axiom}, Pos=({cursor_x},{cursor_y}), Shape={SHAPE}")
     stdscr.addstr(1, 0, "F1=A, F2=B, F3=C, F4=D, F5=E, F6=F, F7=H, F8=I, F9=J | +/-=layers | Arrows=move | Type=insert")
-    stdscr.addstr(2, 0, "Ctrl+D=exit, then check the .html. Prefill vs load is handled by arguments.")
-    stdscr.addstr(3, 0, f"Press SHIFT or others for chars. Current fill_mode={FILL_MODE}.")
+    stdscr.addstr(2, 0, "Ctrl+D=exit, then check the .html | Ctrl+F=fill ring, Ctrl+K=mark, Ctrl+A=fill arc, Ctrl+P=stamp")
+    stdscr.addstr(3, 0, f"Press SHIFT or others for chars. Current fill_mode={FILL_MODE}. Ctrl+E=3D preview, Ctrl+G=find, Ctrl+N/B=next/prev, Ctrl+T=HUD, Ctrl+R=rules")
+    stdscr.addstr(STATUS_LINE, 0, status_message)
 
     grid, read_only = data[(current_layer, current_axiom)]
     dim = layer_dimension(current_layer)
@@ -402,124 +1186,2086 @@ def draw_interface(stdscr):
         row_str = "".join(row_chars)
         stdscr.addstr(offset_line + (draw_y - min_yv), offset_col, row_str)
 
+    # the HUD goes under whichever panel reaches lower
+    hud_row = offset_line + 2 * VIEW_RADIUS + 2
+    if preview_enabled:
+        rows = draw_preview(stdscr, offset_line, offset_col + 2 * VIEW_RADIUS + 5)
+        hud_row = max(hud_row, offset_line + rows + 1)
+
+    if hud_enabled:
+        max_y, max_x = stdscr.getmaxyx()
+        if hud_row < max_y - 1:
+            stdscr.addstr(hud_row, 0, hud_line()[:max_x - 1])
+
     stdscr.refresh()
 
 # ---------------------------------------------------------------------
 # 4) PREFILL
 # ---------------------------------------------------------------------
-def prefill_layers(mode, fillA, fillB, fillC, fillD, fillE, fillF, fillH, fillI, fillJ):
+ONE = ord('1')   # selected cell in a half_mask
+ZERO = ord('0')
+
+# Fill patterns: `--fillX=@<pattern>` instead of a comma separated list.
+#   pattern := rule (';' rule)*          first rule whose layers match wins
+#   rule    := [layers '='] term         layers: N, N-M or N- (default: all)
+#   term    := X                         the whole ring is X
+#            | cycle(ABC)                A, B, C, A, B, ... along the ring
+#            | runs(A3B2.1)              run lengths, repeated along the ring
+#            | layer(ABC)                whole ring is A on layer 0, 3, 6..., B on 1, 4...
+#            | angle(ABCD)               ring split into equal arcs, one per char
+#            | spin(K,term)              term rotated by K ring positions per layer
+#            | mirror(B) / flip(B)       same ring as axiom B (flip: reversed)
+# A '.' in any character list leaves that cell untouched.
+PATTERN_TERM = re.compile(r"(cycle|runs|layer|angle|spin|mirror|flip)\(")
+PATTERN_RUN = re.compile(r"(\D)(\d*)")
+
+def pattern_cells(chars):
+    return [None if ch == '.' else ch for ch in chars]
+
+def parse_pattern_term(src, pos, refs):
+    """
+    Parse one term of a fill pattern starting at src[pos]; return
+    (evaluator, pos after the term). An evaluator maps (layer, n, rings)
+    to a ring list of length n, built with whole-list operations.
+    """
+    match = PATTERN_TERM.match(src, pos)
+    if not match:
+        if pos >= len(src) or src[pos] in "(),;":
+            raise ValueError(f"fill pattern {src!r}: expected a term at {pos}")
+        cell = pattern_cells(src[pos])[0]
+        return (lambda layer, n, rings: [cell] * n), pos + 1
+
+    name = match.group(1)
+    pos = match.end()
+    if name == 'spin':
+        comma = src.find(',', pos)
+        if comma < 0 or not src[pos:comma].lstrip('-').isdigit():
+            raise ValueError(f"fill pattern {src!r}: spin needs (K,term)")
+        step = int(src[pos:comma])
+        inner, pos = parse_pattern_term(src, comma + 1, refs)
+
+        def evaluate(layer, n, rings):
+            ring = inner(layer, n, rings)
+            k = (step * layer) % n
+            return ring[-k:] + ring[:-k] if k else ring
+    else:
+        close = src.find(')', pos)
+        if close <= pos:
+            raise ValueError(f"fill pattern {src!r}: empty or unclosed {name}(")
+        arg = src[pos:close]
+        pos = close
+        if name == 'cycle':
+            period = pattern_cells(arg)
+            evaluate = lambda layer, n, rings: (period * (n // len(period) + 1))[:n]
+        elif name == 'runs':
+            period = []
+            for ch, count in PATTERN_RUN.findall(arg):
+                period += pattern_cells(ch) * (int(count) if count else 1)
+            if not period:
+                raise ValueError(f"fill pattern {src!r}: empty runs()")
+            evaluate = lambda layer, n, rings: (period * (n // len(period) + 1))[:n]
+        elif name == 'layer':
+            cells = pattern_cells(arg)
+            evaluate = lambda layer, n, rings: [cells[layer % len(cells)]] * n
+        elif name == 'angle':
+            cells = pattern_cells(arg)
+
+            def evaluate(layer, n, rings):
+                ring = []
+                for k, cell in enumerate(cells):
+                    ring += [cell] * ((k + 1) * n // len(cells) - k * n // len(cells))
+                return ring
+        else:  # mirror / flip
+            if arg not in AXIOM_CONFIGS:
+                raise ValueError(f"fill pattern {src!r}: unknown axiom {arg!r}")
+            refs.add(arg)
+            reverse = name == 'flip'
+
+            def evaluate(layer, n, rings, ref=arg, reverse=reverse):
+                ring = rings.get(ref)
+                if ring is None:
+                    return [None] * n
+                return ring[::-1] if reverse else list(ring)
+    if pos >= len(src) or src[pos] != ')':
+        raise ValueError(f"fill pattern {src!r}: missing ')' at {pos}")
+    return evaluate, pos + 1
+
+class FillPattern:
+    """
+    A compiled fill pattern (see the grammar above). `ring(layer, n, rings)`
+    evaluates the whole ring at once; `rings` holds the rings already computed
+    for this layer, for mirror()/flip(). `extent` is the last layer named by a
+    closed range (0 if every range is open).
+    """
+    def __init__(self, source):
+        self.source = source
+        self.rules = []
+        self.refs = set()
+        self.extent = 0
+        for rule in source.split(';'):
+            layers, eq, term = rule.partition('=')
+            if not eq:
+                layers, term = '', rule
+            first, last = 1, None
+            if layers:
+                lo, dash, hi = layers.partition('-')
+                if not lo.isdigit() or (hi and not hi.isdigit()):
+                    raise ValueError(f"fill pattern {source!r}: bad layer range {layers!r}")
+                first = int(lo)
+                last = first if not dash else (int(hi) if hi else None)
+                if last is not None:
+                    self.extent = max(self.extent, last)
+            copies = term.startswith(('mirror(', 'flip('))
+            evaluate, end = parse_pattern_term(term, 0, self.refs)
+            if end != len(term):
+                raise ValueError(f"fill pattern {source!r}: unexpected {term[end:]!r}")
+            self.rules.append((first, last, evaluate, copies))
+
+    def match(self, layer):
+        for first, last, evaluate, copies in self.rules:
+            if first <= layer and (last is None or layer <= last):
+                return evaluate, copies
+        return None, False
+
+    def ring(self, layer, n, rings):
+        evaluate, copies = self.match(layer)
+        return evaluate(layer, n, rings) if evaluate else None
+
+    def __reduce__(self):
+        # evaluators are closures; ship the source and recompile in workers
+        return (FillPattern, (self.source,))
+
+    def __repr__(self):
+        return f"@{self.source}"
+
+def fill_extent(fill):
+    """
+    How many layers a fill covers by itself: list length, or pattern extent.
+    """
+    return fill.extent if isinstance(fill, FillPattern) else len(fill)
+
+def prefill_ring(mode, chars_list, layer, rng, rings=None, sampling='uniform'):
+    """
+    Compute the prefill of one (layer, axiom) ring as a list of
+    ring_length(layer) entries (None = left untouched), or None when the
+    layer gets no fill. Works on ring indices only; `rng` is a random.Random.
+    `chars_list` may also be a FillPattern; `rings` then holds this layer's
+    rings of other axioms (for mirror/flip). `sampling` picks the half of the
+    ring that `partial` and `random` fill (see select_mask).
+    """
+    if isinstance(chars_list, FillPattern):
+        return pattern_ring(mode, chars_list, layer, rng, rings or {}, sampling)
+
+    base_char = None
+    if layer <= len(chars_list):
+        base_char = chars_list[layer-1].strip()  # remove extra spaces
+    if not base_char or base_char == DEFAULT_CHAR:  # skip if empty
+        return None
+
+    total = ring_length(layer)
+    if mode == 'full':
+        return [base_char] * total
+
+    mask = select_mask(total, rng, sampling)
+    if mode == 'partial':
+        return [base_char if m == ONE else None for m in mask]
+    if mode == 'random':
+        # randomly fill half, picking from chars_list in one batch
+        choices = [ch.strip() or None for ch in chars_list]
+        picks = iter(rng.choices(choices, k=mask.count(b'1')))
+        return [next(picks) if m == ONE else None for m in mask]
+    return None
+
+def pattern_ring(mode, pattern, layer, rng, rings, sampling='uniform'):
+    """
+    Evaluate a FillPattern for one ring. `partial` and `random` keep the
+    pattern on a random half of the ring; mirror()/flip() rings are copied
+    as-is since the source ring already went through the mode.
+    """
+    evaluate, copies = pattern.match(layer)
+    if evaluate is None:
+        return None
+    total = ring_length(layer)
+    ring = evaluate(layer, total, rings)
+    if mode == 'full' or copies:
+        return ring
+    mask = select_mask(total, rng, sampling)
+    return [ch if m == ONE else None for ch, m in zip(ring, mask)]
+
+def half_mask(total, rng):
+    """
+    Random selection of exactly total // 2 ring cells, as a bytearray of
+    b'0' / b'1' built from one getrandbits call, then nudged to the exact
+    count by flipping a few random cells.
+    """
+    if total == 0:
+        return bytearray()
+    mask = bytearray(format(rng.getrandbits(total), f'0{total}b'), 'ascii')
+    excess = mask.count(b'1') - total // 2
+    have, want = (ONE, ord('0')) if excess > 0 else (ord('0'), ONE)
+    for _ in range(abs(excess)):
+        i = rng.randrange(total)
+        while mask[i] != have:
+            i = rng.randrange(total)
+        mask[i] = want
+    return mask
+
+def select_mask(total, rng, sampling='uniform'):
+    """
+    Pick about half of a ring's cells, as a bytearray of b'0' / b'1':
+      uniform     exactly total // 2 cells, uniformly at random
+      stratified  one cell out of every consecutive pair
+      bluenoise   exactly total // 2 cells spread along the ring by a
+                  golden-ratio sequence with a random phase (no clumps)
+      hash        each cell on its own from a hash of its position, so one
+                  cell's state is computable in O(1) (see cell_selected)
+    """
+    if sampling == 'uniform':
+        return half_mask(total, rng)
+    if sampling == 'stratified':
+        return stratified_mask(total, rng)
+    if sampling == 'bluenoise':
+        return bluenoise_mask(total, rng)
+    if sampling == 'hash':
+        key = rng.getrandbits(64)
+        return bytearray(ONE if hash_bit(key, pos) else ZERO for pos in range(total))
+    raise ValueError(f"unknown sampling {sampling!r}, expected one of {SAMPLERS}")
+
+SAMPLERS = ('uniform', 'stratified', 'bluenoise', 'hash')
+PAIR_CHOICE = {ord('0'): '10', ord('1'): '01'}
+INV_GOLDEN = (math.sqrt(5) - 1) / 2
+MASK64 = (1 << 64) - 1
+
+def stratified_mask(total, rng):
+    pairs = total // 2
+    if pairs == 0:
+        return bytearray(b'0' * total)
+    bits = format(rng.getrandbits(pairs), f'0{pairs}b').translate(PAIR_CHOICE)
+    return bytearray(bits + '0' * (total % 2), 'ascii')
+
+def bluenoise_mask(total, rng):
+    mask = bytearray(b'0' * total)
+    phase = rng.random()
+    for i in range(total // 2):
+        pos = int(((phase + i * INV_GOLDEN) % 1.0) * total)
+        while mask[pos] == ONE:
+            pos = (pos + 1) % total
+        mask[pos] = ONE
+    return mask
+
+def hash_bit(key, pos):
+    """
+    splitmix64 finalizer of (key, pos); True for about half of all positions.
+    """
+    z = (key + (pos + 1) * 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return (z ^ (z >> 31)) >> 63 == 1
+
+def cell_selected(seed, layer, axiom, pos):
+    """
+    Whether ring cell `pos` of (layer, axiom) is selected under `hash`
+    sampling, without computing the rest of the ring. Prefill draws the
+    mask first from the block's stream_rng, so this matches it cell for cell:
+
+    >>> mask = select_mask(ring_length(5), stream_rng(7, 5, 'B'), 'hash')
+    >>> [cell_selected(7, 5, 'B', pos) for pos in range(len(mask))] == [m == ONE for m in mask]
+    True
+    >>> ring = prefill_ring('partial', ['X'] * 5, 5, stream_rng(7, 5, 'B'), sampling='hash')
+    >>> all((ch == 'X') == cell_selected(7, 5, 'B', pos) for pos, ch in enumerate(ring))
+    True
+    """
+    return hash_bit(stream_rng(seed, layer, axiom).getrandbits(64), pos)
+
+def stream_rng(seed, layer, axiom):
+    """
+    Independent RNG stream for one (layer, axiom), derived from the master
+    seed. Its output does not depend on which other blocks are generated, or
+    in what order, so prefill can be sharded, resumed or extended.
+    """
+    digest = hashlib.blake2b(f"{seed}/{layer}/{axiom}".encode('utf-8'), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, 'little'))
+
+def layer_rings(mode, fill_dict, layer, seed=0, axioms=AXIOMS, sampling='uniform'):
+    """
+    Prefill rings of one layer as [(axiom, ring), ...] in `axioms` order.
+    Axioms that mirror others are computed after the axioms they reference.
+    """
+    rings = {}
+
+    def compute(axiom, pending=()):
+        if axiom in rings:
+            return rings[axiom]
+        if axiom in pending:
+            raise ValueError(f"fill patterns mirror each other in a loop: {pending + (axiom,)}")
+        fill = fill_dict[axiom]
+        for ref in sorted(getattr(fill, 'refs', ())):
+            compute(ref, pending + (axiom,))
+        rings[axiom] = prefill_ring(mode, fill, layer, stream_rng(seed, layer, axiom), rings, sampling)
+        return rings[axiom]
+
+    return [(axiom, compute(axiom)) for axiom in axioms]
+
+def iter_prefill(mode, fill_dict, layers, seed=0, axioms=AXIOMS, sampling='uniform'):
+    """
+    Prefill engine: yield (layer, axiom, ring) for each of `layers` (any
+    iterable of layer numbers) and `axioms`, with `ring` as returned by
+    prefill_ring. Deterministic for a given seed, block by block.
+    """
+    for layer in layers:
+        for axiom, ring in layer_rings(mode, fill_dict, layer, seed, axioms, sampling):
+            yield layer, axiom, ring
+
+def apply_ring(layer, axiom, ring):
+    """
+    Write the non-None entries of a ring list into (layer, axiom) in one batch.
+    """
+    return write_ring(layer, axiom, ((i, ch) for i, ch in enumerate(ring) if ch is not None))
+
+PARALLEL_MIN_CELLS = 200000   # below this, worker start-up costs more than it saves
+
+def prefill_chunk(mode, chars_list, axiom, layers, seed, sampling='uniform'):
+    """
+    Worker task for parallel prefill: the rings of one axiom over a layer range,
+    as a list of (layer, ring) pairs.
+    """
+    return [(layer, prefill_ring(mode, chars_list, layer, stream_rng(seed, layer, axiom),
+                                 sampling=sampling))
+            for layer in layers]
+
+def prefill_chunks(layers, workers):
+    """
+    Split `layers` into consecutive ranges holding roughly the same number of
+    ring cells, a few per worker so the pool stays balanced.
+    """
+    layers = list(layers)
+    total = sum(ring_length(layer) for layer in layers)
+    target = max(1, total // (workers * 4))
+    chunks, chunk, size = [], [], 0
+    for layer in layers:
+        chunk.append(layer)
+        size += ring_length(layer)
+        if size >= target:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def iter_prefill_parallel(mode, fill_dict, layers, seed=0, workers=None, sampling='uniform'):
+    """
+    Same output as iter_prefill, computed by a process pool over
+    (axiom, layer range) chunks. Chunks come back in submission order, so
+    each axiom's layers are still applied bottom-up.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = prefill_chunks(layers, workers)
+    tasks = [(axiom, chunk) for chunk in chunks for axiom in AXIOMS]
+    ctx = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("fork")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [pool.submit(prefill_chunk, mode, fill_dict[axiom], axiom, chunk, seed, sampling)
+                   for axiom, chunk in tasks]
+        for (axiom, _), future in zip(tasks, futures):
+            for layer, ring in future.result():
+                yield layer, axiom, ring
+
+def prefill_layers(mode, fillA, fillB, fillC, fillD, fillE, fillF, fillH, fillI, fillJ,
+                   seed=0, layers=None, workers=1, sampling='uniform'):
     """
     For each axiom, we get the fill list (like fillA).
     If that list has length M, we will fill up to layer=M
-    (i.e. layers 1..M).
+    (i.e. layers 1..M). Pass `layers` (e.g. [7] or range(1, 5001))
+    to generate other layers; each block's result stays the same.
+    Blocks that already exist are regenerated: their whole ring is
+    rewritten (cells the fill leaves empty become DEFAULT_CHAR) and the
+    interiors of the layers above are re-copied.
+    With workers > 1 the rings are computed in parallel; results are
+    identical to the serial run for the same seed.
     """
-    max_layers = max(len(fillA), len(fillB), len(fillC),
-                     len(fillD), len(fillE), len(fillF),
-                     len(fillH), len(fillI), len(fillJ))
-    random.seed(0)
-
-    axioms = ['A','B','C','D','E','F','H','I','J']
     fill_dict = {
         'A': fillA, 'B': fillB, 'C': fillC,
         'D': fillD, 'E': fillE, 'F': fillF,
         'H': fillH, 'I': fillI, 'J': fillJ
     }
+    if layers is None:
+        max_layers = max(fill_extent(fill) for fill in fill_dict.values())
+        layers = range(1, max_layers + 1)
+
+    total_cells = sum(ring_length(layer) for layer in layers) * len(AXIOMS)
+    # mirror()/flip() patterns tie axioms together, so those stay serial
+    mirrors = any(getattr(fill, 'refs', None) for fill in fill_dict.values())
+    if workers > 1 and total_cells >= PARALLEL_MIN_CELLS and not mirrors:
+        rings = iter_prefill_parallel(mode, fill_dict, layers, seed, workers, sampling)
+    else:
+        rings = iter_prefill(mode, fill_dict, layers, seed, sampling=sampling)
 
-    for layer in range(1, max_layers + 1):
-        for axiom in axioms:
+    materialize()
+    regenerated = {}   # axiom => lowest layer that existed before
+    for layer, axiom, ring in rings:
+        if (layer, axiom) not in data:
             ensure_layer_axiom(layer, axiom)
-            grid, ro = data[(layer, axiom)]
-            center = layer
-            N = layer
-
-            # gather ring coords
-            ring_coords = []
-            for y in range(-N, N + 1):
-                for x in range(-N, N + 1):
-                    if max(abs(x), abs(y)) == N:
-                        gx = x + center
-                        gy = y + center
-                        if not ro[gy][gx]:
-                            ring_coords.append((gx, gy))
-
-            total = len(ring_coords)
-            if total == 0:
-                continue
+            if ring is not None:
+                apply_ring(layer, axiom, ring)
+            continue
+        regenerated[axiom] = min(layer, regenerated.get(axiom, layer))
+        if ring is None:
+            ring = [DEFAULT_CHAR] * ring_length(layer)
+        else:
+            ring = [DEFAULT_CHAR if ch is None else ch for ch in ring]
+        old_ring = read_ring(layer, axiom)
+        write_ring(layer, axiom, [
+            (i, ch) for i, (ch, old) in enumerate(zip(ring, old_ring)) if ch != old
+        ])
+    for axiom, base in regenerated.items():
+        top = max(layer for layer, a in data if a == axiom)
+        for layer in range(base + 1, top + 1):
+            if (layer, axiom) in data:
+                refresh_interior(layer, axiom)
+
+def iter_prefill_rings(mode, fill_dict, layers, seed=0, sampling='uniform'):
+    """
+    Streaming prefill: yield (layer, axiom, ring) for layers 0..layers in save
+    order, each ring fully resolved to chars. Only one layer's rings are held.
+    """
+    for layer in range(layers + 1):
+        if layer == 0:
+            for axiom in AXIOMS:
+                yield 0, axiom, [CENTER_CHAR]
+            continue
+        rings = dict(layer_rings(mode, fill_dict, layer, seed, sampling=sampling))
+        for axiom in AXIOMS:
+            ring = rings[axiom]
+            if ring is None:
+                ring = [DEFAULT_CHAR] * ring_length(layer)
+            else:
+                ring = [DEFAULT_CHAR if ch is None else ch for ch in ring]
+            yield layer, axiom, ring
 
-            chars_list = fill_dict[axiom]
-            base_char = None
-            if layer <= len(chars_list):
-                base_char = chars_list[layer-1].strip()  # remove extra spaces
-
-            # apply the prefill mode
-            if base_char and base_char != DEFAULT_CHAR:  # skip if empty
-                if mode == 'full':
-                    for (gx, gy) in ring_coords:
-                        grid[gy][gx] = base_char
-                elif mode == 'partial':
-                    selected = random.sample(ring_coords, total//2)
-                    for (gx, gy) in selected:
-                        grid[gy][gx] = base_char
-                elif mode == 'random':
-                    # randomly fill half
-                    selected = random.sample(ring_coords, total//2)
-                    for (gx, gy) in selected:
-                        # pick random from chars_list
-                        ch = random.choice(chars_list).strip()
-                        if ch:
-                            grid[gy][gx] = ch
+def iter_prefill_blocks(mode, fill_dict, layers, seed=0, sampling='uniform'):
+    """
+    Streaming prefill: yield (layer, axiom, rows) for layers 0..layers in save
+    order, without touching `data`. Rows are strings; only the previous grid
+    of each axiom is kept, since every row of a layer contains a row of the
+    layer below.
+    """
+    prev_rows = {}
+    for layer, axiom, ring in iter_prefill_rings(mode, fill_dict, layers, seed, sampling):
+        rows = ring_rows(prev_rows.get(axiom), ring, layer)
+        prev_rows[axiom] = rows
+        yield layer, axiom, rows
+
+# Ring rules: compute layer N+1's ring from layer N's ring, like a 1D
+# cellular automaton growing outward. Ring position j of layer N+1 sits over
+# position j * 8N // (8N + 8) of layer N (both rings are in angle order).
+#   "30"          elementary rule on (left, center, right) of the cell below
+#   "T:2,3"       totalistic: alive if left + center + right is 2 or 3
+#   "T:2,3/B,C"   ... also counting the cell below in axioms B and C
+# A cell is alive when it holds anything but ' ' or DEFAULT_CHAR.
+EMPTY_CELLS = (' ', '', DEFAULT_CHAR)
+parent_index_cache = {}
+
+def parent_indices(layer):
+    """
+    (left, center, right) ring indices on layer-1 under each ring cell of `layer`.
+    """
+    cached = parent_index_cache.get(layer)
+    if cached is None:
+        n, m = ring_length(layer), ring_length(layer - 1)
+        center = [j * m // n for j in range(n)]
+        cached = ([(i - 1) % m for i in center], center, [(i + 1) % m for i in center])
+        parent_index_cache[layer] = cached
+    return cached
+
+def check_rule_char(char):
+    if char is not None and len(char) != 1:
+        raise ValueError(f"ring rule char must be a single character, got {char!r}")
+
+class RingRule:
+    """
+    A compiled ring rule (see the spec above). New live cells take the char
+    of the cell below (or its left/right neighbour), or `char` when given.
+    """
+    def __init__(self, spec, char=None):
+        check_rule_char(char)
+        self.spec = spec
+        self.char = char
+        self.axioms = []
+        rule, _, axioms = spec.partition('/')
+        if axioms:
+            self.axioms = [ax for ax in axioms.split(',') if ax]
+            unknown = [ax for ax in self.axioms if ax not in AXIOM_CONFIGS]
+            if unknown:
+                raise ValueError(f"ring rule {spec!r}: unknown axioms {unknown}")
+        if rule.startswith('T:'):
+            self.number = None
+            counts = [c.strip() for c in rule[2:].split(',') if c.strip()]
+            bad = [c for c in counts if not c.isdigit()]
+            if bad or not counts:
+                raise ValueError(f"ring rule {spec!r}: T: needs a comma-separated list of live counts, got {bad or rule[2:]!r}")
+            self.counts = {int(c) for c in counts}
+        elif rule.isdigit() and int(rule) < 256 and not self.axioms:
+            self.number = int(rule)
+        else:
+            raise ValueError(f"ring rule {spec!r}: expected 0-255 or T:<counts>[/axioms]")
+
+    def ring(self, prev_rings, axiom, layer):
+        """
+        The ring of (layer, axiom) computed from `prev_rings` (axiom => ring of layer-1).
+        """
+        prev = prev_rings[axiom]
+        alive = [ch not in EMPTY_CELLS for ch in prev]
+        li, ci, ri = parent_indices(layer)
+        left = [alive[i] for i in li]
+        center = [alive[i] for i in ci]
+        right = [alive[i] for i in ri]
+        if self.number is not None:
+            bits = self.number
+            out = [(bits >> (4 * l + 2 * c + r)) & 1 for l, c, r in zip(left, center, right)]
+        else:
+            counts = [l + c + r for l, c, r in zip(left, center, right)]
+            for other in self.axioms:
+                if other != axiom:
+                    other_alive = [ch not in EMPTY_CELLS for ch in prev_rings[other]]
+                    counts = [n + other_alive[i] for n, i in zip(counts, ci)]
+            out = [n in self.counts for n in counts]
+        if self.char:
+            return [self.char if o else DEFAULT_CHAR for o in out]
+        fallback = '#'
+        return [
+            DEFAULT_CHAR if not o
+            else prev[c] if ac else prev[l] if al else prev[r] if ar else fallback
+            for o, l, c, r, al, ac, ar in zip(out, li, ci, ri, left, center, right)
+        ]
+
+def refresh_interior(layer, axiom):
+    """
+    Re-copy the layer below into the read-only interior of (layer, axiom),
+    as create_layer_axiom does, after the lower layer changed.
+    """
+    grid, _ = data[(layer, axiom)]
+    prev_grid, _ = data[(layer - 1, axiom)]
+    offset = (len(grid) - len(prev_grid)) // 2
+    changed = False
+    for py, prev_row in enumerate(prev_grid):
+        if CENTER_CHAR in prev_row:
+            prev_row = [' ' if ch == CENTER_CHAR else ch for ch in prev_row]
+        row = grid[py + offset]
+        if row[offset:offset + len(prev_row)] != prev_row:
+            row[offset:offset + len(prev_row)] = prev_row
+            changed = True
+    if changed:
+        grid_hashed.add((layer, axiom))
+        mark_dirty(layer, axiom)
+        journal_record({'op': 'refresh', 'layer': layer, 'axiom': axiom})
+
+def run_rules(rule, base_layer, top_layer, axioms=AXIOMS):
+    """
+    Recompute the rings of layers base_layer+1..top_layer from base_layer
+    upward, one layer at a time across axioms. Only cells that change are
+    written. Returns the number of cells written.
+    """
+    global rule_floor
+    sources = set(axioms) | set(rule.axioms)
+    written = 0
+    for layer in range(base_layer + 1, top_layer + 1):
+        prev_rings = {}
+        for axiom in sources:
+            ensure_layer_axiom(layer - 1, axiom)
+            prev_rings[axiom] = read_ring(layer - 1, axiom)
+        for axiom in axioms:
+            if (layer, axiom) in data:
+                refresh_interior(layer, axiom)
+            else:
+                ensure_layer_axiom(layer, axiom)
+            new_ring = rule.ring(prev_rings, axiom, layer)
+            old_ring = read_ring(layer, axiom)
+            written += write_ring(layer, axiom, [
+                (i, ch) for i, (ch, old) in enumerate(zip(new_ring, old_ring)) if ch != old
+            ])
+    rule_floor = None
+    return written
 
 # ---------------------------------------------------------------------
 # 5) SAVE / LOAD
 # ---------------------------------------------------------------------
-def save_game_state(filename):
+# Format 1 stores every grid in full:
+#   BEGIN LAYER 2 AXIOM C DIM 5 / 5 rows / END LAYER
+# Format 2 starts with "SAVE FORMAT 2" and stores only the ring of each block,
+# in ring_positions order, since its interior is the layer below with
+# CENTER_CHAR blanked:
+#   BEGIN RING 2 AXIOM C LEN 16 / the ring on one line / END RING
+# A block whose interior does not match (e.g. the layer below was edited
+# afterwards) is still written in full, so format 2 is lossless.
+FORMAT_HEADER = "SAVE FORMAT"
+SAVE_FORMATS = (1, 2, 'binary', 'sqlite')
+
+def interior_matches(layer, axiom):
     """
-    Save the entire `data` dict to a text file,
-    including layer, axiom, dimension, and the entire grid.
+    Whether (layer, axiom) can be rebuilt from its ring and the layer below.
     """
+    if layer == 0:
+        return True
+    below = data.get((layer - 1, axiom))
+    if below is None:
+        return False
+    grid = data[(layer, axiom)][0]
+    for row, prev_row in zip(grid[1:-1], below[0]):
+        if "".join(row[1:-1]) != "".join(prev_row).replace(CENTER_CHAR, ' '):
+            return False
+    return True
+
+# Both formats end with an index footer giving each block's byte range and
+# cells_digest, so a reader can seek straight to one block (see SaveIndex)
+# and tell blocks apart without reading them (see diff_saves):
+#   INDEX BEGIN / BLOCK <layer> <axiom> <RING|LAYER> <offset> <length> <digest> ... /
+#   INDEX END <offset of INDEX BEGIN>
+# Footers written before digests were added lack the last field. Loaders
+# that read the whole file skip the footer.
+INDEX_BEGIN = "INDEX BEGIN"
+INDEX_END = "INDEX END"
+
+def write_grid_block(f, layer, axiom, rows, digest=None):
+    """
+    Write one full block; returns its index entry
+    (layer, axiom, kind, offset, length, digest). `digest` is the block's
+    cells_digest if the caller already has it.
+    """
+    offset = f.tell()
+    f.write(f"BEGIN LAYER {layer} AXIOM {axiom} DIM {layer_dimension(layer)}\n")
+    f.write("\n".join(rows))
+    f.write("\nEND LAYER\n")
+    return layer, axiom, 'LAYER', offset, f.tell() - offset, digest or cells_digest('LAYER', "".join(rows))
+
+def write_ring_block(f, layer, axiom, ring, digest=None):
+    """
+    Write one ring-only block; returns its index entry like write_grid_block.
+    """
+    offset = f.tell()
+    text = "".join(ring)
+    f.write(f"BEGIN RING {layer} AXIOM {axiom} LEN {len(ring)}\n")
+    f.write(text)
+    f.write("\nEND RING\n")
+    return layer, axiom, 'RING', offset, f.tell() - offset, digest or cells_digest('RING', text)
+
+def write_text_index(f, entries):
+    start = f.tell()
+    f.write(INDEX_BEGIN + "\n")
+    for layer, axiom, kind, offset, length, digest in entries:
+        if digest is None:   # carried over from an older footer
+            f.write(f"BLOCK {layer} {axiom} {kind} {offset} {length}\n")
+        else:
+            f.write(f"BLOCK {layer} {axiom} {kind} {offset} {length} {digest.hex()}\n")
+    f.write(f"{INDEX_END} {start}\n")
+
+def check_save_format(version):
+    if version not in SAVE_FORMATS:
+        raise ValueError(f"unknown save format {version!r}, expected one of {SAVE_FORMATS}")
+
+# Compressed saves: a text or binary save can be stored as a gzip, bz2 or
+# xz stream. Readers recognise one by its magic bytes; a save is compressed
+# when COMPRESSION is set or its name ends in .gz, .bz2 or .xz. The save is
+# written uncompressed first (the writers seek back to patch headers) and
+# then streamed through the codec, so memory stays bounded both ways. Compressed saves are always written in
+# full; loading decompresses them into a temporary file first (see
+# spool_save) and reads that through its index, like any other save.
+COMPRESSIONS = {'gzip': gzip, 'bz2': bz2, 'lzma': lzma}
+COMPRESSION_MAGIC = {b'\x1f\x8b': 'gzip', b'BZh': 'bz2', b'\xfd7zXZ\x00': 'lzma'}
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma'}
+
+def check_compression(codec):
+    if codec is not None and codec not in COMPRESSIONS:
+        raise ValueError(f"unknown compression {codec!r}, expected one of {tuple(COMPRESSIONS)}")
+
+def compression_of(filename):
+    """
+    The codec `filename` is compressed with, from its magic bytes, or None.
+    """
+    with open(filename, 'rb') as f:
+        head = f.read(6)
+    for magic, codec in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+def save_compression(filename):
+    return COMPRESSION or COMPRESSION_SUFFIXES.get(os.path.splitext(filename)[1])
+
+def check_save_target(filename, version):
+    """
+    Reject a save of `version` to `filename` that cannot be written;
+    returns the codec it will be compressed with, or None.
+    """
+    check_save_format(version)
+    codec = save_compression(filename)
+    check_compression(codec)
+    if codec and version == 'sqlite':
+        raise ValueError(f"sqlite saves cannot be compressed ({filename!r} would be {codec})")
+    return codec
+
+def open_save(filename, buffering=1 << 20):
+    """
+    Open a save file 'rb', decompressing it on the fly if it is compressed.
+    """
+    codec = compression_of(filename)
+    if codec is None:
+        return open(filename, 'rb', buffering=buffering)
+    return COMPRESSIONS[codec].open(filename, 'rb')
+
+def spool_save(filename, directory):
+    """
+    Decompress the save at `filename` into `directory`, so it can be read
+    through its index; returns the copy's path, or `filename` itself if it
+    is not compressed.
+    """
+    codec = compression_of(filename)
+    if codec is None:
+        return filename
+    path = os.path.join(directory, os.path.basename(filename) + ".spool")
+    with COMPRESSIONS[codec].open(filename, 'rb') as src, open(path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    return path
+
+def compress_save(filename, codec):
+    """
+    Replace the save at `filename` with its `codec` stream.
+    """
+    tmp = filename + ".tmp"
+    with open(filename, 'rb') as src, COMPRESSIONS[codec].open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp, filename)
+
+def save_game_state(filename, version=None, full=False):
+    """
+    Save the entire `data` dict to a file in SAVE_FORMAT (or `version`),
+    compressed as save_compression says.
+    When `filename` is the save this world came from, in the same format,
+    only dirty blocks are rewritten (see save_incremental) unless `full`;
+    when this session already saved the world there, no block changed since
+    and the file is untouched, nothing is written (and nothing is hashed).
+    Returns the number of blocks written.
+    """
+    global saved_path
+    version = version or SAVE_FORMAT
+    codec = check_save_target(filename, version)
+    if not full and lazy_source is None and filename in saved_worlds:
+        if saved_worlds[filename] == (version, codec, world_changes, file_stamp(filename)):
+            saved_path = filename
+            dirty_blocks.clear()
+            return 0
+    written = write_save(filename, version, full)
+    if codec:
+        compress_save(filename, codec)
+    if lazy_source is None:
+        saved_worlds[filename] = (version, codec, world_changes, file_stamp(filename))
+    return written
+
+def write_save(filename, version, full):
+    """
+    save_game_state without the compression step.
+    """
+    global saved_path
+    if not full:
+        written = save_incremental(filename, version)
+        if written is not None:
+            return written
+    materialize()
+    saved_path = filename
+    dirty_blocks.clear()
+    if version == 'sqlite':
+        save_world_db(filename)
+        return len(data)
+    if version == 'binary':
+        with open(filename, 'wb') as f:
+            write_binary_save(f, iter_data_cells())
+        return len(data)
     with open(filename, 'w', encoding='utf-8') as f:
+        if version >= 2:
+            f.write(f"{FORMAT_HEADER} {version}\n")
         # Sort by layer, then axiom
+        entries = []
         for (layer, axiom) in sorted(data.keys(), key=lambda x: (x[0], x[1])):
-            grid, ro = data[(layer, axiom)]
-            dim = layer_dimension(layer)
-            f.write(f"BEGIN LAYER {layer} AXIOM {axiom} DIM {dim}\n")
-            for row in grid:
-                f.write("".join(row) + "\n")
-            f.write("END LAYER\n")
+            if version >= 2 and interior_matches(layer, axiom):
+                entries.append(write_ring_block(f, layer, axiom, read_ring(layer, axiom),
+                                                saved_digest(layer, axiom, 'RING')))
+            else:
+                grid, ro = data[(layer, axiom)]
+                entries.append(write_grid_block(f, layer, axiom, ["".join(row) for row in grid],
+                                                saved_digest(layer, axiom, 'LAYER')))
+        write_text_index(f, entries)
+    return len(data)
+
+# Incremental saves rewrite only dirty blocks and leave the rest of the file
+# alone. The index footer decides which copy of a block is current, so
+# loaders read indexed files through it:
+#   text    changed blocks are appended, followed by a new footer
+#   binary  a changed block that still packs to the same size is
+#           overwritten in place, others are appended where the palette
+#           was, and the palette, index and trailer are rewritten after them
+# Once superseded copies make up more than half the file, the next save is
+# a full one.
+def save_format_of(filename):
+    with open_save(filename) as f:
+        head = f.read(32)
+    if head.startswith(BINARY_MAGIC):
+        return 'binary'
+    if head.startswith(SQLITE_MAGIC):
+        return 'sqlite'
+    if head.startswith(FORMAT_HEADER.encode('ascii')):
+        version = head[len(FORMAT_HEADER):].split()[0]
+        return int(version) if version.isdigit() else None
+    return 1
+
+def blocks_to_resave(index):
+    """
+    Dirty blocks, plus each block stored as a ring right above one: its
+    ring would be rebuilt on the new block below, so unless its interior
+    matches that (e.g. it was re-copied) it has to be written out too.
+    """
+    keys = set(dirty_blocks)
+    for layer, axiom in dirty_blocks:
+        above = (layer + 1, axiom)
+        if above in keys or index.get(above, ('LAYER',))[0] != 'RING':
+            continue
+        ensure_layer_axiom(*above)   # read it (lazily) before the file changes
+        if not interior_matches(*above):
+            keys.add(above)
+    return sorted(keys)
 
-def load_game_state(filename):
+def save_incremental(filename, version):
     """
-    Load from file into `data`, ignoring read-only details initially
-    (all become read_only=False).
+    Rewrite only the dirty blocks of `filename`. Returns the number of
+    blocks written, or None when a full save is needed instead (not the
+    file this world came from, another format, no index, too much garbage).
     """
-    data.clear()
-    with open(filename, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    idx = 0
-    while idx < len(lines):
-        line = lines[idx].rstrip('\n')
-        if line.startswith("BEGIN LAYER"):
-            parts = line.split()
-            # e.g. "BEGIN LAYER 2 AXIOM C DIM 5"
-            layer = int(parts[2])
-            axiom = parts[4]
-            dim = int(parts[6])
-            idx += 1
-
-            new_grid = []
-            for _ in range(dim):
-                row_str = lines[idx].rstrip('\n')
-                new_grid.append(list(row_str))
-                idx += 1
-
-            # skip "END LAYER"
-            idx += 1
-
-            read_only = [[False]*dim for _ in range(dim)]
-            data[(layer, axiom)] = (new_grid, read_only)
+    global saved_path
+    if filename != saved_path or not os.path.exists(filename) or save_format_of(filename) != version:
+        return None
+    if compression_of(filename) or save_compression(filename):
+        return None
+    if version == 'sqlite':
+        index = read_db_index(filename)
+    else:
+        with open(filename, 'rb') as f:
+            index = read_index(f)
+            size = f.seek(0, os.SEEK_END)
+        if index is None or size > 2 * sum(length for _, _, length, _ in index.values()) + (1 << 16):
+            return None
+    keys = blocks_to_resave(index)
+    if keys:
+        with lazy_lock:
+            if version == 'sqlite':
+                resave_db_blocks(filename, keys)
+            elif version == 'binary':
+                resave_binary_blocks(filename, index, keys)
+            else:
+                resave_text_blocks(filename, index, keys, version)
+            if lazy_source is not None and lazy_source.filename == filename:
+                lazy_source.reload()
+    saved_path = filename
+    dirty_blocks.clear()
+    return len(keys)
+
+def resave_text_blocks(filename, index, keys, version):
+    with open(filename, 'a', encoding='utf-8') as f:
+        for layer, axiom in keys:
+            if version >= 2 and interior_matches(layer, axiom):
+                entry = write_ring_block(f, layer, axiom, read_ring(layer, axiom),
+                                         saved_digest(layer, axiom, 'RING'))
+            else:
+                grid, _ = data[(layer, axiom)]
+                entry = write_grid_block(f, layer, axiom, ["".join(row) for row in grid],
+                                         saved_digest(layer, axiom, 'LAYER'))
+            index[(layer, axiom)] = entry[2:]
+        write_text_index(f, [key + index[key] for key in sorted(index)])
+
+def stream_prefill_to_file(filename, mode, fill_dict, layers, seed=0, sampling='uniform', version=None):
+    """
+    Write a prefilled world straight to a save file (same bytes as
+    prefill_layers + save_game_state) without building `data`.
+    Format 2 holds one layer of rings at a time, format 1 one grid per axiom.
+    Returns the number of bytes written.
+    """
+    version = version or SAVE_FORMAT
+    codec = check_save_target(filename, version)
+    write_prefill(filename, mode, fill_dict, layers, seed, sampling, version)
+    if codec:
+        compress_save(filename, codec)
+    return os.path.getsize(filename)
+
+def write_prefill(filename, mode, fill_dict, layers, seed, sampling, version):
+    if version in ('binary', 'sqlite'):
+        blocks = ((layer, axiom, b'R', "".join(ring), None) for layer, axiom, ring
+                  in iter_prefill_rings(mode, fill_dict, layers, seed, sampling))
+        if version == 'sqlite':
+            stream_world_db(filename, blocks)
+        else:
+            with open(filename, 'wb', buffering=1 << 20) as f:
+                write_binary_save(f, blocks)
+        return
+    with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        if version >= 2:
+            f.write(f"{FORMAT_HEADER} {version}\n")
+            entries = [write_ring_block(f, layer, axiom, ring) for layer, axiom, ring
+                       in iter_prefill_rings(mode, fill_dict, layers, seed, sampling)]
+        else:
+            entries = [write_grid_block(f, layer, axiom, rows) for layer, axiom, rows
+                       in iter_prefill_blocks(mode, fill_dict, layers, seed, sampling)]
+        write_text_index(f, entries)
+
+def parse_block_header(line, lineno):
+    """
+    Parse "BEGIN LAYER <n> AXIOM <a> DIM <d>" or "BEGIN RING <n> AXIOM <a> LEN <k>"
+    into (kind, layer, axiom, size), checking size against the layer.
+    """
+    parts = line.split()
+    if (len(parts) != 7 or parts[0] != 'BEGIN' or parts[3] != 'AXIOM'
+            or (parts[1], parts[5]) not in (('LAYER', 'DIM'), ('RING', 'LEN'))):
+        raise ValueError(f"line {lineno}: expected 'BEGIN LAYER <n> AXIOM <a> DIM <d>' "
+                         f"or 'BEGIN RING <n> AXIOM <a> LEN <k>', got {line[:60]!r}")
+    kind, axiom = parts[1], parts[4]
+    try:
+        layer, size = int(parts[2]), int(parts[6])
+    except ValueError:
+        raise ValueError(f"line {lineno}: layer and {parts[5]} must be integers, got {line!r}") from None
+    if layer < 0 or axiom not in AXIOM_CONFIGS:
+        raise ValueError(f"line {lineno}: unknown block layer {layer} axiom {axiom!r}")
+    expected = layer_dimension(layer) if kind == 'LAYER' else ring_length(layer)
+    if size != expected:
+        raise ValueError(f"line {lineno}: layer {layer} must have {parts[5]} {expected}, got {size}")
+    return kind, layer, axiom, size
+
+def iter_saved_blocks(f, below=None):
+    """
+    Parse an open save file (format 1 or 2) one block at a time, yielding
+    (layer, axiom, rows) with each row as a string; ring blocks are rebuilt
+    on top of the layer below. Only the latest block of each axiom is held
+    in memory (in `below`, axiom -> (layer, rows)); malformed input raises
+    ValueError with its line number.
+    """
+    lines = enumerate(f, 1)
+    lineno = 0
+    below = {} if below is None else below
+    for lineno, line in lines:
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+        if line == INDEX_BEGIN:
+            for lineno, line in lines:
+                if line.startswith(INDEX_END):
+                    break
+            else:
+                raise ValueError(f"line {lineno}: file ends inside the index")
+            continue
+        if line.startswith(FORMAT_HEADER):
+            version = line[len(FORMAT_HEADER):].strip()
+            if lineno != 1 or not version.isdigit() or int(version) not in SAVE_FORMATS:
+                raise ValueError(f"line {lineno}: unsupported {line!r}")
+            continue
+        kind, layer, axiom, size = parse_block_header(line, lineno)
+        end = "END " + kind
+        count = size if kind == 'LAYER' else 1
+
+        rows = []
+        for lineno, row in lines:
+            row = row.rstrip('\n')
+            if len(rows) == count:
+                if row != end:
+                    raise ValueError(f"line {lineno}: expected {end!r} after {count} rows, got {row[:60]!r}")
+                break
+            if len(row) != size:
+                raise ValueError(f"line {lineno}: {kind.lower()} of layer {layer} axiom {axiom} has "
+                                 f"{len(row)} cells, expected {size}")
+            rows.append(row)
+        else:
+            raise ValueError(f"line {lineno}: file ends inside layer {layer} axiom {axiom}")
+
+        if kind == 'RING':
+            rows = rows_from_ring(below, layer, axiom, rows[0], f"line {lineno}")
+        below[axiom] = (layer, rows)
+        yield layer, axiom, rows
+
+def rows_from_ring(below, layer, axiom, ring, where):
+    """
+    Rows of a ring-only block, rebuilt on the last block read for the same
+    axiom (`below` maps axiom -> (layer, rows)).
+    """
+    prev_layer, prev_rows = below.get(axiom, (None, None))
+    if layer and prev_layer != layer - 1:
+        raise ValueError(f"{where}: ring of layer {layer} axiom {axiom} needs layer {layer - 1} before it")
+    return ring_rows(prev_rows, ring, layer)
+
+# Binary format: palette indices instead of text, so a block loads with one
+# read and one str.translate instead of a parse per line.
+#   header   magic b"AXGB", version, byte offset of the palette
+#   blocks   layer, axiom number, kind (b'R' ring / b'G' grid), typecode
+#            (b'B' one byte per cell / b'I' four), cell count, then the
+#            packed indices; ring blocks follow ring_positions order and
+#            grid blocks are row-major, as in the text formats
+#   palette  count, then each char as a length-prefixed UTF-8 string
+#   index    count, then (layer, axiom number, kind, offset, length,
+#            cells_digest) per block; version 1 files have no digest and
+#            an all-zero digest stands for a missing one
+#   trailer  byte offset of the index, b"AXIX"
+# The palette goes last so a world can be streamed out before all of its
+# chars are known.
+BINARY_MAGIC = b"AXGB"
+BINARY_VERSION = 2
+BINARY_HEADER = struct.Struct('<4sHQ')
+BINARY_BLOCK = struct.Struct('<IB1s1sI')
+BINARY_COUNT = struct.Struct('<I')
+BINARY_ITEMSIZE = {b'B': 1, b'I': 4}
+BINARY_ENTRIES = {1: struct.Struct('<IB1sQQ'), 2: struct.Struct('<IB1sQQ16s')}   # by version
+NO_DIGEST = bytes(16)
+BINARY_TRAILER = struct.Struct('<Q4s')
+INDEX_MAGIC = b"AXIX"
+BLOCK_KINDS = {b'R': 'RING', b'G': 'LAYER', 'RING': b'R', 'LAYER': b'G'}
+
+def block_cells(layer, axiom):
+    """
+    One block of `data` for the binary format as (kind, cells, digest),
+    ring-only when the interior can be rebuilt from the layer below; see
+    saved_digest for the digest.
+    """
+    if interior_matches(layer, axiom):
+        return b'R', "".join(read_ring(layer, axiom)), saved_digest(layer, axiom, 'RING')
+    grid, _ = data[(layer, axiom)]
+    return b'G', "".join(["".join(row) for row in grid]), saved_digest(layer, axiom, 'LAYER')
+
+def iter_data_cells():
+    for (layer, axiom) in sorted(data.keys()):
+        yield (layer, axiom) + block_cells(layer, axiom)
+
+def pack_cells(cells, codes):
+    """
+    Palette-encode a string of cells, adding new chars to `codes`
+    (char -> index). Returns (typecode, payload).
+    """
+    for ch in sorted(set(cells).difference(codes)):
+        codes[ch] = len(codes)
+    if len(codes) <= 256:
+        return b'B', cells.translate({ord(ch): i for ch, i in codes.items()}).encode('latin-1')
+    packed = array.array('I', [codes[ch] for ch in cells])
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return b'I', packed.tobytes()
+
+def write_binary_save(f, blocks):
+    """
+    Write (layer, axiom, kind, cells, digest) blocks to a binary file
+    opened 'wb'; a None digest is computed from the cells.
+    """
+    codes = {}
+    entries = []
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0))
+    for layer, axiom, kind, cells, digest in blocks:
+        offset = f.tell()
+        typecode, payload = pack_cells(cells, codes)
+        f.write(BINARY_BLOCK.pack(layer, AXIOMS.index(axiom), kind, typecode, len(cells)))
+        f.write(payload)
+        entries.append((layer, AXIOMS.index(axiom), kind, offset, f.tell() - offset,
+                        digest or cells_digest(BLOCK_KINDS[kind], cells)))
+    write_binary_tail(f, codes, entries)
+
+def write_binary_tail(f, codes, entries):
+    """
+    Write the palette, index and trailer at the current position and point
+    the header at them.
+    """
+    palette_offset = f.tell()
+    f.write(BINARY_COUNT.pack(len(codes)))
+    for ch in codes:
+        raw = ch.encode('utf-8')
+        f.write(bytes([len(raw)]) + raw)
+    index_offset = f.tell()
+    f.write(BINARY_COUNT.pack(len(entries)))
+    entry_struct = BINARY_ENTRIES[BINARY_VERSION]
+    for entry in entries:
+        f.write(entry_struct.pack(*entry[:5], entry[5] or NO_DIGEST))
+    f.write(BINARY_TRAILER.pack(index_offset, INDEX_MAGIC))
+    f.truncate()
+    f.seek(0)
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, palette_offset))
+
+def resave_binary_blocks(filename, index, keys):
+    with open(filename, 'r+b') as f:
+        palette_offset, palette = read_binary_head(f)
+        codes = {ch: i for i, ch in enumerate(palette)}
+        appended = []
+        for layer, axiom in keys:
+            kind, cells, digest = block_cells(layer, axiom)
+            digest = digest or cells_digest(BLOCK_KINDS[kind], cells)
+            typecode, payload = pack_cells(cells, codes)
+            block = BINARY_BLOCK.pack(layer, AXIOMS.index(axiom), kind, typecode, len(cells)) + payload
+            old = index.get((layer, axiom))
+            if old is not None and old[0] == BLOCK_KINDS[kind] and old[2] == len(block):
+                f.seek(old[1])
+                f.write(block)
+                index[(layer, axiom)] = old[:3] + (digest,)
+            else:
+                appended.append((layer, axiom, kind, block, digest))
+        f.seek(palette_offset)
+        for layer, axiom, kind, block, digest in appended:
+            index[(layer, axiom)] = (BLOCK_KINDS[kind], f.tell(), len(block), digest)
+            f.write(block)
+        write_binary_tail(f, codes, [(layer, AXIOMS.index(axiom), BLOCK_KINDS[kind], offset, length, digest)
+                                     for (layer, axiom), (kind, offset, length, digest) in sorted(index.items())])
+
+def read_palette(f):
+    head = f.read(BINARY_COUNT.size)
+    if len(head) != BINARY_COUNT.size:
+        raise ValueError("binary save: palette is missing")
+    count, = BINARY_COUNT.unpack(head)
+    palette = []
+    for _ in range(count):
+        size = f.read(1)
+        raw = f.read(size[0]) if size else b''
+        if not size or len(raw) != size[0]:
+            raise ValueError("binary save: palette is truncated")
+        palette.append(raw.decode('utf-8'))
+    return palette
+
+def read_binary_head(f):
+    """
+    Header and palette of an open binary save: (palette offset, palette).
+    """
+    f.seek(0)
+    header = f.read(BINARY_HEADER.size)
+    if len(header) != BINARY_HEADER.size:
+        raise ValueError("binary save: file is too short")
+    magic, version, palette_offset = BINARY_HEADER.unpack(header)
+    if magic != BINARY_MAGIC or version not in BINARY_ENTRIES:
+        raise ValueError(f"binary save: unsupported header {magic!r} version {version}")
+    f.seek(palette_offset)
+    return palette_offset, read_palette(f)
+
+def read_binary_block(f, offset, palette, below):
+    """
+    Decode the binary block at byte `offset`, rebuilding a ring on `below`
+    (axiom -> (layer, rows), updated in place). Returns
+    (layer, axiom, rows, offset of the next block).
+    """
+    layer, axiom, kind, text, end = read_binary_cells(f, offset, palette)
+    rows = cells_rows(below, layer, axiom, kind, text, f"byte {offset}")
+    return layer, axiom, rows, end
+
+def read_binary_cells(f, offset, palette):
+    """
+    The binary block at byte `offset` as stored:
+    (layer, axiom, 'RING' or 'LAYER', cells, offset of the next block).
+    """
+    f.seek(offset)
+    head = f.read(BINARY_BLOCK.size)
+    if len(head) != BINARY_BLOCK.size:
+        raise ValueError(f"byte {offset}: binary save ends inside a block header")
+    layer, number, kind, typecode, cells = BINARY_BLOCK.unpack(head)
+    if number >= len(AXIOMS) or kind not in (b'R', b'G') or typecode not in BINARY_ITEMSIZE:
+        raise ValueError(f"byte {offset}: bad block header {head!r}")
+    axiom = AXIOMS[number]
+    dim = layer_dimension(layer)
+    expected = ring_length(layer) if kind == b'R' else dim * dim
+    if cells != expected:
+        raise ValueError(f"byte {offset}: layer {layer} axiom {axiom} has {cells} cells, expected {expected}")
+    payload = f.read(cells * BINARY_ITEMSIZE[typecode])
+    if len(payload) != cells * BINARY_ITEMSIZE[typecode]:
+        raise ValueError(f"byte {offset}: binary save ends inside layer {layer} axiom {axiom}")
+    text = unpack_cells(typecode, payload, palette, f"byte {offset}")
+    return layer, axiom, BLOCK_KINDS[kind], text, offset + BINARY_BLOCK.size + len(payload)
+
+def unpack_cells(typecode, payload, palette, where):
+    """
+    Inverse of pack_cells: the string of cells a payload encodes.
+    """
+    if typecode == b'B':
+        if payload and max(payload) >= len(palette):
+            raise ValueError(f"{where}: palette index out of range")
+        return payload.decode('latin-1').translate(dict(enumerate(palette)))
+    indices = array.array('I')
+    indices.frombytes(payload)
+    if sys.byteorder == 'big':
+        indices.byteswap()
+    if indices and max(indices) >= len(palette):
+        raise ValueError(f"{where}: palette index out of range")
+    return "".join([palette[i] for i in indices])
+
+def cells_rows(below, layer, axiom, kind, text, where):
+    """
+    Rows of a decoded 'RING' or 'LAYER' block; records them in `below`.
+    """
+    dim = layer_dimension(layer)
+    expected = ring_length(layer) if kind == 'RING' else dim * dim
+    if len(text) != expected:
+        raise ValueError(f"{where}: layer {layer} axiom {axiom} has {len(text)} cells, expected {expected}")
+    if kind == 'RING':
+        rows = rows_from_ring(below, layer, axiom, text, where)
+    else:
+        rows = [text[i:i + dim] for i in range(0, len(text), dim)]
+    below[axiom] = (layer, rows)
+    return rows
+
+def iter_binary_blocks(f):
+    """
+    Parse an open binary save one block at a time, yielding
+    (layer, axiom, rows) like iter_saved_blocks. Malformed input raises
+    ValueError with the byte offset of the block.
+    """
+    palette_offset, palette = read_binary_head(f)
+    below = {}
+    offset = BINARY_HEADER.size
+    while offset < palette_offset:
+        layer, axiom, rows, offset = read_binary_block(f, offset, palette, below)
+        yield layer, axiom, rows
+
+def read_index(f):
+    """
+    The index footer of a save file opened 'rb', as
+    {(layer, axiom): (kind, offset, length, digest)}, or None if it has
+    none. digest is the block's cells_digest, None in older footers.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    index = {}
+    if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+        if size < BINARY_HEADER.size + BINARY_TRAILER.size:
+            return None
+        f.seek(0)
+        _, version, _ = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+        entry_struct = BINARY_ENTRIES.get(version)
+        f.seek(size - BINARY_TRAILER.size)
+        start, magic = BINARY_TRAILER.unpack(f.read(BINARY_TRAILER.size))
+        if magic != INDEX_MAGIC or entry_struct is None:
+            return None
+        f.seek(start)
+        count, = BINARY_COUNT.unpack(f.read(BINARY_COUNT.size))
+        for _ in range(count):
+            layer, number, kind, offset, length, *digest = entry_struct.unpack(f.read(entry_struct.size))
+            digest = digest[0] if digest and digest[0] != NO_DIGEST else None
+            index[(layer, AXIOMS[number])] = (BLOCK_KINDS[kind], offset, length, digest)
+        return index
+
+    f.seek(max(0, size - 64))
+    last = f.read().decode('utf-8', 'replace').rstrip('\n').rsplit('\n', 1)[-1]
+    if not last.startswith(INDEX_END + " "):
+        return None
+    f.seek(int(last[len(INDEX_END):]))
+    for line in f:
+        parts = line.decode('utf-8').split()
+        if parts[:1] == ['BLOCK'] and len(parts) in (6, 7):
+            digest = bytes.fromhex(parts[6]) if len(parts) == 7 else None
+            index[(int(parts[1]), parts[2])] = (parts[3], int(parts[4]), int(parts[5]), digest)
+        elif line.startswith(INDEX_END.encode('ascii')):
+            break
+    return index
+
+def scan_index(f):
+    """
+    Build the index of a save file opened 'rb' that has no footer, in one
+    pass over its block headers.
+    """
+    index = {}
+    f.seek(0)
+    if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+        palette_offset, palette = read_binary_head(f)
+        offset = BINARY_HEADER.size
+        while offset < palette_offset:
+            f.seek(offset)
+            layer, number, kind, typecode, cells = BINARY_BLOCK.unpack(f.read(BINARY_BLOCK.size))
+            length = BINARY_BLOCK.size + cells * BINARY_ITEMSIZE.get(typecode, 1)
+            index[(layer, AXIOMS[number])] = (BLOCK_KINDS[kind], offset, length, None)
+            offset += length
+        return index
+
+    f.seek(0)
+    offset = 0
+    lines = enumerate(f, 1)
+    for lineno, line in lines:
+        start = offset
+        offset += len(line)
+        if not line.startswith(b'BEGIN '):
+            continue
+        kind, layer, axiom, size = parse_block_header(line.decode('utf-8'), lineno)
+        # the rows, then END
+        for _ in range(size + 1 if kind == 'LAYER' else 2):
+            lineno, line = next(lines, (lineno, b''))
+            offset += len(line)
+        index[(layer, axiom)] = (kind, start, offset - start, None)
+    return index
+
+# SQLite store: one row per (layer, axiom) with the block packed as in the
+# binary format (palette indices, ring-only where possible) and its
+# cells_digest, plus the palette. The database runs in WAL mode, so other
+# processes can read a world while this one saves to it. Databases written
+# before digests were added get the column (empty) when next opened for
+# writing.
+SQLITE_MAGIC = b"SQLite format 3\x00"
+SQLITE_BATCH = 512    # rows per executemany (and per commit when streaming)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS palette (code INTEGER PRIMARY KEY, ch TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS blocks (
+    layer INTEGER NOT NULL,
+    axiom TEXT NOT NULL,
+    kind TEXT NOT NULL,          -- RING or LAYER
+    typecode TEXT NOT NULL,      -- B (1 byte per cell) or I (4)
+    cells BLOB NOT NULL,
+    digest BLOB,                 -- cells_digest, NULL in older databases
+    PRIMARY KEY (layer, axiom)
+) WITHOUT ROWID;
+"""
+
+def open_world_db(filename):
+    db = sqlite3.connect(filename, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SQLITE_SCHEMA)
+    if not db_has_digests(db):
+        db.execute("ALTER TABLE blocks ADD COLUMN digest BLOB")
+    return db
+
+def db_has_digests(db):
+    return any(column[1] == 'digest' for column in db.execute("PRAGMA table_info(blocks)"))
+
+def write_db_blocks(db, blocks, codes, commit=False):
+    """
+    Insert (layer, axiom, kind, cells, digest) blocks, SQLITE_BATCH rows
+    per executemany, adding new chars to `codes` and the palette table; a
+    None digest is computed from the cells.
+    With `commit`, each batch is its own transaction.
+    """
+    batch = []
+
+    def flush():
+        db.executemany("INSERT OR REPLACE INTO blocks (layer, axiom, kind, typecode, cells, digest) "
+                       "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        db.executemany("INSERT OR IGNORE INTO palette VALUES (?, ?)", [(i, ch) for ch, i in codes.items()])
+        batch.clear()
+        if commit:
+            db.commit()
+
+    for layer, axiom, kind, cells, digest in blocks:
+        typecode, payload = pack_cells(cells, codes)
+        batch.append((layer, axiom, BLOCK_KINDS[kind], typecode.decode('ascii'), payload,
+                      digest or cells_digest(BLOCK_KINDS[kind], cells)))
+        if len(batch) >= SQLITE_BATCH:
+            flush()
+    flush()
+
+def save_world_db(filename):
+    """
+    Replace the world stored in `filename` with `data`, in one transaction.
+    """
+    db = open_world_db(filename)
+    try:
+        with db:
+            db.execute("DELETE FROM blocks")
+            db.execute("DELETE FROM palette")
+            write_db_blocks(db, iter_data_cells(), {})
+    finally:
+        db.close()
+
+def stream_world_db(filename, blocks):
+    if os.path.exists(filename):
+        os.remove(filename)
+    db = open_world_db(filename)
+    try:
+        write_db_blocks(db, blocks, {}, commit=True)
+    finally:
+        db.close()
+
+def read_db_palette(db):
+    return [ch for _, ch in db.execute("SELECT code, ch FROM palette ORDER BY code")]
+
+def read_db_index(filename):
+    """
+    {(layer, axiom): (kind, 0, 0, digest)} for a world database, shaped
+    like read_index.
+    """
+    db = sqlite3.connect(filename)
+    try:
+        digest = "digest" if db_has_digests(db) else "NULL"
+        return {(layer, axiom): (kind, 0, 0, digest)
+                for layer, axiom, kind, digest in db.execute(f"SELECT layer, axiom, kind, {digest} FROM blocks")}
+    finally:
+        db.close()
+
+def resave_db_blocks(filename, keys):
+    db = open_world_db(filename)
+    try:
+        with db:
+            codes = {ch: i for i, ch in enumerate(read_db_palette(db))}
+            write_db_blocks(db, ((layer, axiom) + block_cells(layer, axiom) for layer, axiom in keys), codes)
+    finally:
+        db.close()
+
+class SaveIndex:
+    """
+    Random access to the blocks of a save file or world database. Opening
+    reads only the header and the index footer (files without one are
+    scanned once);
+    rows(layer, axiom) then reads just that block and, for ring-only blocks,
+    the rings below it down to the nearest full block. The last block built
+    for each axiom is kept, so walking up or down a few layers is cheap.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open_save(filename)
+        self.db = None
+        if self.file.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC:
+            self.file.close()
+            self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.reload()
+
+    def reload(self):
+        """
+        Re-read the header and index after the file was saved to.
+        """
+        self.below = {}   # axiom -> (layer, rows) of the last block built
+        if self.db is not None:
+            self.palette = read_db_palette(self.db)
+            self.blocks = read_db_index(self.filename)
+            return
+        self.file.seek(0)
+        self.binary = self.file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+        self.palette = read_binary_head(self.file)[1] if self.binary else None
+        self.blocks = read_index(self.file)
+        if self.blocks is None:
+            self.blocks = scan_index(self.file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
         else:
-            idx += 1
+            self.file.close()
+
+    def __contains__(self, key):
+        return key in self.blocks
+
+    def keys(self):
+        return sorted(self.blocks)
+
+    def rows(self, layer, axiom):
+        """
+        The rows (strings) of (layer, axiom).
+        """
+        if (layer, axiom) not in self.blocks:
+            raise KeyError((layer, axiom))
+        # walk down to a block that can be built on its own
+        chain = []
+        for n in range(layer, -1, -1):
+            built = self.below.get(axiom)
+            if built and built[0] == n:
+                break
+            if (n, axiom) not in self.blocks:
+                raise ValueError(f"{self.filename}: layer {n + 1} axiom {axiom} is a ring "
+                                 f"but layer {n} is missing")
+            chain.append(n)
+            if self.blocks[(n, axiom)][0] == 'LAYER':
+                break
+        for n in reversed(chain):
+            self.read_block(n, axiom)
+        return self.below[axiom][1]
+
+    def read_block(self, layer, axiom):
+        kind, offset, length, _ = self.blocks[(layer, axiom)]
+        try:
+            if self.db is not None:
+                typecode, payload = self.db.execute(
+                    "SELECT typecode, cells FROM blocks WHERE layer = ? AND axiom = ?", (layer, axiom)).fetchone()
+                text = unpack_cells(typecode.encode('ascii'), payload, self.palette, "database")
+                cells_rows(self.below, layer, axiom, kind, text, "database")
+            elif self.binary:
+                read_binary_block(self.file, offset, self.palette, self.below)
+            else:
+                self.file.seek(offset)
+                chunk = io.StringIO(self.file.read(length).decode('utf-8'))
+                for _ in iter_saved_blocks(chunk, self.below):
+                    pass
+        except ValueError as e:
+            raise ValueError(f"{self.filename}, block at byte {offset}: {e}") from None
+        if self.below.get(axiom, (None,))[0] != layer:
+            raise ValueError(f"{self.filename}: index points at the wrong block for layer {layer} axiom {axiom}")
+
+    def raw_block(self, layer, axiom):
+        """
+        The bytes (layer, axiom) is stored as, palette-encoded for binary
+        saves and databases.
+        """
+        kind, offset, length, _ = self.blocks[(layer, axiom)]
+        if self.db is not None:
+            typecode, payload = self.db.execute(
+                "SELECT typecode, cells FROM blocks WHERE layer = ? AND axiom = ?", (layer, axiom)).fetchone()
+            return kind.encode('ascii') + typecode.encode('ascii') + payload
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def stored_cells(self, layer, axiom):
+        """
+        (kind, cells) of (layer, axiom) from its own block, without
+        rebuilding anything below it: the ring for 'RING' blocks, the whole
+        grid row by row for 'LAYER' blocks.
+        """
+        kind, offset, length, _ = self.blocks[(layer, axiom)]
+        where = f"{self.filename}, layer {layer} axiom {axiom}"
+        if self.db is not None:
+            raw = self.raw_block(layer, axiom)
+            text = unpack_cells(raw[len(kind):len(kind) + 1], raw[len(kind) + 1:], self.palette, where)
+        elif self.binary:
+            _, _, kind, text, _ = read_binary_cells(self.file, offset, self.palette)
+        else:
+            lines = self.raw_block(layer, axiom).decode('utf-8').split('\n')
+            kind, _, _, size = parse_block_header(lines[0], 1)
+            text = lines[1] if kind == 'RING' else "".join(lines[1:1 + size])
+        dim = layer_dimension(layer)
+        if len(text) != (ring_length(layer) if kind == 'RING' else dim * dim):
+            raise ValueError(f"{where}: block has {len(text)} cells")
+        return kind, text
+
+    def ring(self, layer, axiom):
+        """
+        The ring of (layer, axiom) as a string in ring_positions order.
+        """
+        kind, text = self.stored_cells(layer, axiom)
+        if kind == 'RING':
+            return text
+        dim = layer_dimension(layer)
+        return "".join([text[(y + layer) * dim + x + layer] for x, y in ring_positions(layer)])
+
+def iter_file_blocks(filename):
+    """
+    Yield (layer, axiom, rows) from a save file in any format, in
+    (layer, axiom) order. Indexed files are read through their index, which
+    skips blocks that incremental saves superseded; compressed files are
+    decompressed to a temporary copy first so that holds for them too.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = spool_save(filename, tmp)
+        with open(path, 'rb') as f:
+            head = f.read(len(SQLITE_MAGIC))
+            binary = head.startswith(BINARY_MAGIC)
+            indexed = head == SQLITE_MAGIC or read_index(f) is not None
+        if indexed:
+            with SaveIndex(path) as index:
+                for layer, axiom in index.keys():
+                    yield layer, axiom, index.rows(layer, axiom)
+        elif binary:
+            with open(path, 'rb', buffering=1 << 20) as f:
+                yield from iter_binary_blocks(f)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield from iter_saved_blocks(f)
+
+# Parallel loading: the blocks of an indexed save are decoded by a process
+# pool, one task per run of layers of an axiom. A ring block is rebuilt on
+# the block below it, so runs only start at full blocks; format 2 and
+# binary saves, which are rings all the way down, get one run per axiom.
+# Workers send back each block's rows joined into one string, which
+# pickles as a single buffer; the main process splits the rows and stores
+# them. Small or unindexed saves load serially.
+PARALLEL_LOAD_MIN_CELLS = 4000000   # below this, the pool costs more than it saves
+
+def load_chunks(blocks, workers):
+    """
+    Split an index {(layer, axiom): (kind, ...)} into (axiom, layers) runs
+    of roughly equal cells, each starting at a full block or the bottom of
+    its axiom.
+    """
+    total = sum(layer_dimension(layer) ** 2 for layer, _ in blocks)
+    target = max(1, total // (workers * 4))
+    tasks = []
+    for axiom in AXIOMS:
+        chunk, size = [], 0
+        for layer in sorted(layer for layer, a in blocks if a == axiom):
+            if size >= target and blocks[(layer, axiom)][0] == 'LAYER':
+                tasks.append((axiom, chunk))
+                chunk, size = [], 0
+            chunk.append(layer)
+            size += layer_dimension(layer) ** 2
+        if chunk:
+            tasks.append((axiom, chunk))
+    return tasks
+
+def load_plan(filename, workers):
+    """
+    The load_chunks tasks for loading `filename` with `workers` processes,
+    or None when it should be read serially.
+    """
+    if workers <= 1 or compression_of(filename):
+        return None
+    with open(filename, 'rb') as f:
+        if f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC:
+            blocks = read_db_index(filename)
+        else:
+            blocks = read_index(f)
+    if not blocks or sum(layer_dimension(layer) ** 2 for layer, _ in blocks) < PARALLEL_LOAD_MIN_CELLS:
+        return None
+    return load_chunks(blocks, workers)
+
+def decode_chunk(filename, axiom, layers):
+    """
+    Worker task for parallel load: the blocks of one axiom over a run of
+    layers, as (layer, rows joined into one string) pairs.
+    """
+    with SaveIndex(filename) as index:
+        return [(layer, "".join(index.rows(layer, axiom))) for layer in layers]
+
+def iter_file_blocks_parallel(filename, tasks, workers):
+    """
+    The blocks of iter_file_blocks, decoded by a process pool over `tasks`
+    (see load_plan) and yielded axiom by axiom.
+    """
+    ctx = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("fork")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [pool.submit(decode_chunk, filename, axiom, layers) for axiom, layers in tasks]
+        for (axiom, _), future in zip(tasks, futures):
+            for layer, cells in future.result():
+                dim = layer_dimension(layer)
+                yield layer, axiom, [cells[i:i + dim] for i in range(0, len(cells), dim)]
+
+def load_game_state(filename, workers=None):
+    """
+    Load from file into `data`, ignoring read-only details initially
+    (all become read_only=False). The file is parsed as a stream, so peak
+    memory is the loaded world plus one block. Text and binary saves, and
+    compressed ones, are told apart by their first bytes; compressed ones
+    are decompressed to a temporary file and loaded from that. Big indexed
+    saves are decoded by `workers` processes (LOAD_WORKERS, or one per CPU).
+    """
+    global saved_path
+    clear_data()
+    saved_path = filename
+    workers = workers or LOAD_WORKERS or os.cpu_count() or 1
+    # the grids are millions of small lists and none of them form cycles;
+    # letting the collector rescan them as they pile up doubles load time
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = spool_save(filename, tmp)
+            tasks = load_plan(path, workers)
+            if tasks:
+                blocks = iter_file_blocks_parallel(path, tasks, workers)
+            else:
+                blocks = iter_file_blocks(path)
+            for layer, axiom, rows in blocks:
+                dim = len(rows)
+                put_block(layer, axiom, [list(row) for row in rows], [[False]*dim for _ in range(dim)])
+    finally:
+        if collecting:
+            gc.enable()
+
+def bench_load(filename, repeat=3):
+    """
+    Load `filename`, re-save it in every format and time parsing alone and
+    load_game_state on each copy (best of `repeat`).
+    Returns [(format, bytes, parse seconds, load seconds)].
+    """
+    load_game_state(filename)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for version in SAVE_FORMATS:
+            path = os.path.join(tmp, f"world.{version}")
+            save_game_state(path, version)
+            parse = load = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _ in iter_file_blocks(path):
+                    pass
+                parsed = time.perf_counter()
+                load_game_state(path)
+                done = time.perf_counter()
+                parse = parsed - started if parse is None else min(parse, parsed - started)
+                load = done - parsed if load is None else min(load, done - parsed)
+            results.append((version, os.path.getsize(path), parse, load))
+    return results
+
+def bench_compress(filename):
+    """
+    Load `filename`, save it in each file format and stream every copy
+    through each codec. Returns [(format, codec, raw bytes, compressed
+    bytes, compress seconds, decompress seconds)].
+    """
+    load_game_state(filename)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for version in SAVE_FORMATS:
+            if version == 'sqlite':
+                continue
+            raw = os.path.join(tmp, f"world.{version}")
+            save_game_state(raw, version, full=True)
+            for codec, module in COMPRESSIONS.items():
+                packed = f"{raw}.{codec}"
+                started = time.perf_counter()
+                with open(raw, 'rb') as src, module.open(packed, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                compressed = time.perf_counter()
+                with open_save(packed) as f:
+                    while f.read(1 << 20):
+                        pass
+                done = time.perf_counter()
+                results.append((version, codec, os.path.getsize(raw), os.path.getsize(packed),
+                                compressed - started, done - compressed))
+    return results
+
+# Lazy loading (--lazy): open the --load file through its index and read
+# each block the first time ensure_layer_axiom needs it, so the first frame
+# costs the same however big the save is. A background thread reads the
+# layers around the current one ahead of time into `prefetched`; only the
+# main thread ever touches `data`.
+PREFETCH_LAYERS = 2    # layers above and below the current one to read ahead
+lazy_source = None     # SaveIndex of the save being loaded lazily
+lazy_lock = threading.Lock()
+prefetched = {}        # (layer, axiom) -> rows read ahead, not yet in `data`
+prefetch_queue = queue.Queue()
+
+def open_lazy(filename):
+    global lazy_source, saved_path
+    clear_data()
+    saved_path = filename
+    lazy_source = SaveIndex(filename)
+    threading.Thread(target=prefetch_worker, daemon=True).start()
+
+def load_lazy_block(layer, axiom):
+    """
+    Move one block of the lazy save into `data`, with the read-only
+    interior reapply_read_only_inheritance would give it.
+    """
+    rows = prefetched.pop((layer, axiom), None)
+    if rows is None:
+        with lazy_lock:
+            rows = lazy_source.rows(layer, axiom)
+    dim = len(rows)
+    read_only = [[False] * dim for _ in range(dim)]
+    if layer and (layer - 1, axiom) in lazy_source:
+        for row in read_only[1:-1]:
+            row[1:-1] = [True] * (dim - 2)
+    put_block(layer, axiom, [list(row) for row in rows], read_only)
+
+def prefetch_around(layer, axiom):
+    if lazy_source is None:
+        return
+    for n in range(layer - PREFETCH_LAYERS, layer + PREFETCH_LAYERS + 1):
+        key = (n, axiom)
+        if key in lazy_source and key not in data and key not in prefetched:
+            prefetch_queue.put(key)
+
+def prefetch_worker():
+    while True:
+        key = prefetch_queue.get()
+        with lazy_lock:
+            if lazy_source is None or key in data or key in prefetched:
+                continue
+            prefetched[key] = lazy_source.rows(*key)
+
+def materialize():
+    """
+    Read every block of the lazy save not loaded yet; called before
+    anything that needs the whole world (render, save, search, rules).
+    """
+    global lazy_source
+    if lazy_source is None:
+        return
+    for key in lazy_source.keys():
+        if key not in data:
+            load_lazy_block(*key)
+    with lazy_lock:
+        lazy_source.close()
+        lazy_source = None
+        prefetched.clear()
+
+# Journal (--journal): every edit is appended to <snapshot>.journal as one
+# JSON line, so a crashed session can be rebuilt by loading the snapshot
+# and replaying the journal. Lines are flushed after each key press and
+# fsynced in batches. Once the journal grows past JOURNAL_COMPACT_BYTES it
+# is set aside as <snapshot>.journal.old and a forked child, which sees
+# `data` exactly as it is at that moment, writes a new snapshot and then
+# drops the old segment. Records only set cells, so replaying a segment
+# that a finished compaction already folded in is harmless.
+#   {"op": "create", "layer": 3, "axiom": "A"}                  block created
+#   {"op": "ring", "layer": 3, "axiom": "A", "cells": [[i, ch], ...]}
+#   {"op": "cells", "layer": 3, "axiom": "A", "cells": [[gx, gy, ch], ...]}
+#   {"op": "refresh", "layer": 3, "axiom": "A"}                 interior re-copied
+JOURNAL_SYNC_RECORDS = 64          # fsync after this many records...
+JOURNAL_SYNC_SECONDS = 1.0         # ...or this long after the last fsync
+JOURNAL_COMPACT_BYTES = 8 << 20    # fold into a new snapshot past this size
+journal = None                     # open journal file while journaling
+journal_path = None
+snapshot_path = None
+journal_pending = 0                # records written since the last fsync
+journal_synced_at = 0.0
+compactor = None                   # running compaction process
+
+def journal_record(record):
+    global journal_pending
+    if journal is None:
+        return
+    journal.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+    journal_pending += 1
+    if (journal_pending >= JOURNAL_SYNC_RECORDS
+            or time.monotonic() - journal_synced_at >= JOURNAL_SYNC_SECONDS):
+        journal_sync()
+
+def journal_sync():
+    global journal_pending, journal_synced_at
+    journal.flush()
+    os.fsync(journal.fileno())
+    journal_pending = 0
+    journal_synced_at = time.monotonic()
+    if journal.tell() >= JOURNAL_COMPACT_BYTES:
+        compact_journal()
+
+def journal_flush():
+    """
+    Hand buffered records to the OS (survives a crash of this process);
+    fsync once a batch is due.
+    """
+    if journal is None or not journal_pending:
+        return
+    if time.monotonic() - journal_synced_at >= JOURNAL_SYNC_SECONDS:
+        journal_sync()
+    else:
+        journal.flush()
+
+def apply_journal_record(record):
+    layer, axiom, op = record['layer'], record['axiom'], record['op']
+    ensure_layer_axiom(layer, axiom)
+    if op == 'ring':
+        write_ring(layer, axiom, [(i, ch) for i, ch in record['cells']])
+    elif op == 'cells':
+        write_cells(layer, axiom, [(gx, gy, ch) for gx, gy, ch in record['cells']])
+    elif op == 'refresh':
+        refresh_interior(layer, axiom)
+    elif op != 'create':
+        raise ValueError(f"unknown journal op {op!r}")
+
+def replay_journal(path):
+    """
+    Re-apply <path>.journal.old and <path>.journal on top of the snapshot
+    just loaded from `path`. A torn last line (a crash mid-write) is
+    dropped. Returns the number of records applied.
+    """
+    applied = 0
+    for segment in (path + '.journal.old', path + '.journal'):
+        if not os.path.exists(segment):
+            continue
+        with open(segment, 'r', encoding='utf-8') as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.endswith("\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                    apply_journal_record(record)
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{segment} line {lineno}: bad journal record ({e})") from None
+                applied += 1
+    return applied
+
+def start_journal(path, loaded=None):
+    """
+    Journal edits against the snapshot at `path`. If that is not the file
+    the world was loaded from (with its journal replayed), any old journal
+    there is discarded and a first snapshot is written in the background.
+    """
+    global journal, journal_path, snapshot_path, journal_synced_at
+    snapshot_path = path
+    journal_path = path + '.journal'
+    fresh = path != loaded or not os.path.exists(path)
+    if fresh:
+        for segment in (journal_path, journal_path + '.old'):
+            if os.path.exists(segment):
+                os.remove(segment)
+    journal = open(journal_path, 'a', encoding='utf-8')
+    journal_synced_at = time.monotonic()
+    if fresh:
+        compact_journal()
+
+def compact_journal():
+    """
+    Fold the journal into a new snapshot in the background. Skipped while
+    a compaction is still running or a lazy save is open (the child would
+    share its file handle); the journal just keeps growing until then.
+    """
+    global journal, compactor
+    if compactor is not None and compactor.is_alive():
+        return False
+    if lazy_source is not None:
+        return False
+    journal.flush()
+    os.fsync(journal.fileno())
+    journal.close()
+    segment = journal_path + '.old'
+    if os.path.exists(segment):
+        # an earlier compaction never finished: keep its edits in front
+        with open(segment, 'ab') as old, open(journal_path, 'rb') as new:
+            shutil.copyfileobj(new, old)
+        os.remove(journal_path)
+    else:
+        os.replace(journal_path, segment)
+    journal = open(journal_path, 'a', encoding='utf-8')
+    compactor = multiprocessing.get_context('fork').Process(
+        target=write_snapshot, args=(snapshot_path, segment), daemon=True)
+    compactor.start()
+    return True
+
+def write_snapshot(path, segment):
+    """
+    Compaction child: write `data` to `path` atomically, in the format and
+    compression `path` already has, then drop the journal segment it
+    folded in.
+    """
+    global COMPRESSION
+    version, COMPRESSION = SAVE_FORMAT, save_compression(path)
+    if os.path.exists(path):
+        version = save_format_of(path) or SAVE_FORMAT
+        COMPRESSION = compression_of(path)   # this process only lives for the snapshot
+    if version == 'sqlite':
+        # replaced in one transaction; readers keep their view until it commits
+        save_game_state(path, version, full=True)
+    else:
+        tmp = path + '.tmp'
+        save_game_state(tmp, version, full=True)
+        with open(tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    os.remove(segment)
+
+def stop_journal():
+    """
+    Sync and close the journal and wait for a running compaction, so it
+    cannot replace a snapshot saved after this.
+    """
+    global journal, compactor
+    if journal is None:
+        return
+    journal.flush()
+    os.fsync(journal.fileno())
+    journal.close()
+    journal = None
+    if compactor is not None:
+        compactor.join()
+        compactor = None
+
+def drop_journal(path):
+    """
+    The world was just saved in full to `path`, so any journal kept against
+    an older snapshot there is folded in (replaying it later could undo
+    newer edits) and can go.
+    """
+    for segment in (path + '.journal', path + '.journal.old'):
+        if os.path.exists(segment):
+            os.remove(segment)
+
+# Diff and merge (--diff, --merge): two saves are compared block by block
+# through their indexes. Blocks whose index digests (see cells_digest) are
+# equal are skipped without being read; for indexes without digests, blocks
+# whose stored bytes hash the same (with the same palette, for binary saves
+# and databases) are skipped without being decoded. The rest are compared
+# ring against ring, each read from its own block, so the cost beyond the
+# index follows the number of changed blocks.
+# A three-way merge applies to OURS every ring cell THEIRS changed from
+# BASE, unless OURS changed that cell differently.
+DIFF_CELLS_SHOWN = 20   # changed cells --diff lists per block
+
+def block_digest(index, layer, axiom):
+    return hashlib.blake2b(index.raw_block(layer, axiom), digest_size=16).digest()
+
+def same_block(old, new, key, same_palette):
+    """
+    Whether `key` holds the same cells in two SaveIndexes, judged from
+    their index digests when both have one, else from the stored bytes.
+    """
+    old_kind, _, _, old_digest = old.blocks[key]
+    new_kind, _, _, new_digest = new.blocks[key]
+    if old_digest is not None and new_digest is not None:
+        return old_digest == new_digest
+    return (same_palette and old_kind == new_kind
+            and block_digest(old, *key) == block_digest(new, *key))
+
+def diff_saves(old_file, new_file):
+    """
+    Compare two saves. Returns [(layer, axiom, changes)] for the blocks
+    that differ, in (layer, axiom) order, where changes is
+    [(ring_index, old char, new char)], 'added', 'removed', or 'interior'
+    for a full block whose rings match but whose inside does not.
+    """
+    diffs = []
+    with SaveIndex(old_file) as old, SaveIndex(new_file) as new:
+        # equal bytes mean equal cells when the palettes agree on the codes
+        # both have (incremental saves only ever append to a palette)
+        old_palette, new_palette = old.palette or [], new.palette or []
+        shared = min(len(old_palette), len(new_palette))
+        same_palette = old_palette[:shared] == new_palette[:shared]
+        for key in sorted(set(old.blocks) | set(new.blocks)):
+            if key not in new:
+                diffs.append(key + ('removed',))
+            elif key not in old:
+                diffs.append(key + ('added',))
+            elif not same_block(old, new, key, same_palette):
+                before, after = old.ring(*key), new.ring(*key)
+                changes = [(i, a, b) for i, (a, b) in enumerate(zip(before, after)) if a != b]
+                if not changes and 'LAYER' in (old.blocks[key][0], new.blocks[key][0]):
+                    if old.rows(*key) != new.rows(*key):
+                        changes = 'interior'
+                if changes:
+                    diffs.append(key + (changes,))
+    return diffs
+
+def merge_saves(base_file, ours_file, theirs_file):
+    """
+    Load OURS into `data` and apply the ring edits THEIRS made to BASE:
+    changed cells OURS left as in BASE, and blocks only THEIRS has. Blocks
+    stacked on an edited one whose interior was inherited are re-copied.
+    Returns (cells applied, conflicts) with conflicts as
+    [(layer, axiom, ring_index or None, what)].
+    """
+    load_game_state(ours_file)
+    edits = {}
+    conflicts = []
+    added = []
+    with SaveIndex(theirs_file) as theirs:
+        for layer, axiom, changes in diff_saves(base_file, theirs_file):
+            key = (layer, axiom)
+            if changes == 'added' and key not in data:
+                added.append((layer, axiom, theirs.rows(layer, axiom)))
+                continue
+            if changes in ('removed', 'interior') or key not in data:
+                conflicts.append((layer, axiom, None, changes if key in data else 'removed in ours'))
+                continue
+            ours = read_ring(layer, axiom)
+            if changes == 'added':
+                # both sides added the block; only matching cells merge
+                changes = [(i, None, ch) for i, ch in enumerate(theirs.ring(layer, axiom))]
+            for i, old, ch in changes:
+                if ours[i] == old:
+                    edits.setdefault(key, []).append((i, ch))
+                elif ours[i] != ch:
+                    conflicts.append((layer, axiom, i, f"ours {ours[i]!r}, theirs {ch!r}"))
+    # which blocks above an edit inherit their interior, before it changes
+    floors = {}
+    for layer, axiom in edits:
+        floors[axiom] = min(layer, floors.get(axiom, layer))
+    inherited = [(layer, axiom) for layer, axiom in sorted(data)
+                 if layer > floors.get(axiom, layer) and interior_matches(layer, axiom)]
+    applied = 0
+    for (layer, axiom), updates in edits.items():
+        applied += write_ring(layer, axiom, updates)
+    for layer, axiom, rows in sorted(added):
+        dim = len(rows)
+        put_block(layer, axiom, [list(row) for row in rows], [[False] * dim for _ in range(dim)])
+        dirty_blocks.add((layer, axiom))
+        applied += ring_length(layer)
+    for layer, axiom in inherited:
+        refresh_interior(layer, axiom)
+    return applied, conflicts
 
 def reapply_read_only_inheritance():
     """
@@ -548,79 +3294,453 @@ def reapply_read_only_inheritance():
 # ---------------------------------------------------------------------
 # 6) CURSES UI
 # ---------------------------------------------------------------------
-def run(stdscr):
-    global current_layer, current_axiom
+def run(stdscr, record_file=None):
     curses.curs_set(0)
     stdscr.nodelay(False)
     stdscr.keypad(True)
+    if record_file:
+        with open(record_file, 'w', encoding='utf-8') as out:
+            out.write(f"# recorded with: {' '.join(sys.argv[1:])}\n")
+            session_loop(RecordingScreen(stdscr, out))
+    else:
+        session_loop(stdscr)
 
+def session_loop(stdscr, step_times=None):
+    """
+    Draw / read key / dispatch until Ctrl+D. Shared by the curses UI and the
+    headless driver; when `step_times` is a list, (key, seconds) from each
+    key press to the end of the following draw is appended to it.
+    """
     go_to_layer_axiom(0, 'A')
+    stdscr.timeout(PREVIEW_FRAME_MS if preview_enabled else -1)
 
+    key_time = None
+    key = None
     while True:
         draw_interface(stdscr)
+        if key_time is not None:
+            elapsed = time.perf_counter() - key_time
+            frame_times.append(elapsed)
+            if step_times is not None:
+                step_times.append((key, elapsed))
+            key_time = None
         key = stdscr.getch()
         if key == -1:
             continue
+        key_time = time.perf_counter()
 
-        # Ctrl+D => exit
-        if key == 4:
+        if not handle_key(stdscr, key):
             break
+        journal_flush()
 
-        if   key == curses.KEY_F1: go_to_layer_axiom(current_layer, 'A')
-        elif key == curses.KEY_F2: go_to_layer_axiom(current_layer, 'B')
-        elif key == curses.KEY_F3: go_to_layer_axiom(current_layer, 'C')
-        elif key == curses.KEY_F4: go_to_layer_axiom(current_layer, 'D')
-        elif key == curses.KEY_F5: go_to_layer_axiom(current_layer, 'E')
-        elif key == curses.KEY_F6: go_to_layer_axiom(current_layer, 'F')
-        elif key == curses.KEY_F7: go_to_layer_axiom(current_layer, 'H')
-        elif key == curses.KEY_F8: go_to_layer_axiom(current_layer, 'I')
-        elif key == curses.KEY_F9: go_to_layer_axiom(current_layer, 'J')
-        elif key == ord('+'):
-            go_to_layer_axiom(current_layer + 1, current_axiom)
-        elif key == ord('-'):
-            if current_layer > 0:
-                go_to_layer_axiom(current_layer - 1, current_axiom)
-        elif key == curses.KEY_LEFT:
-            move_cursor(-1, 0)
-        elif key == curses.KEY_RIGHT:
-            move_cursor(1, 0)
-        elif key == curses.KEY_UP:
-            move_cursor(0, -1)
-        elif key == curses.KEY_DOWN:
-            move_cursor(0, 1)
-        elif 32 <= key < 127:
-            ch = chr(key)
-            insert_char(ch)
+        # animate the preview camera, otherwise block on input
+        stdscr.timeout(PREVIEW_FRAME_MS if preview_enabled else -1)
+
+def handle_key(stdscr, key):
+    """
+    Dispatch one key press. Returns False when the session should end.
+    """
+    # Ctrl+D => exit
+    if key == 4:
+        return False
+
+    if   key == curses.KEY_F1: go_to_layer_axiom(current_layer, 'A')
+    elif key == curses.KEY_F2: go_to_layer_axiom(current_layer, 'B')
+    elif key == curses.KEY_F3: go_to_layer_axiom(current_layer, 'C')
+    elif key == curses.KEY_F4: go_to_layer_axiom(current_layer, 'D')
+    elif key == curses.KEY_F5: go_to_layer_axiom(current_layer, 'E')
+    elif key == curses.KEY_F6: go_to_layer_axiom(current_layer, 'F')
+    elif key == curses.KEY_F7: go_to_layer_axiom(current_layer, 'H')
+    elif key == curses.KEY_F8: go_to_layer_axiom(current_layer, 'I')
+    elif key == curses.KEY_F9: go_to_layer_axiom(current_layer, 'J')
+    elif key == ord('+'):
+        go_to_layer_axiom(current_layer + 1, current_axiom)
+    elif key == ord('-'):
+        if current_layer > 0:
+            go_to_layer_axiom(current_layer - 1, current_axiom)
+    elif key == curses.KEY_LEFT:
+        move_cursor(-1, 0)
+    elif key == curses.KEY_RIGHT:
+        move_cursor(1, 0)
+    elif key == curses.KEY_UP:
+        move_cursor(0, -1)
+    elif key == curses.KEY_DOWN:
+        move_cursor(0, 1)
+    elif key == 6:   # Ctrl+F
+        bulk_fill_ring(stdscr)
+    elif key == 11:  # Ctrl+K
+        set_arc_mark()
+    elif key == 1:   # Ctrl+A
+        bulk_fill_arc(stdscr)
+    elif key == 16:  # Ctrl+P
+        bulk_stamp_pattern(stdscr)
+    elif key == 5:   # Ctrl+E
+        toggle_preview()
+    elif key == 7:   # Ctrl+G
+        search_char(stdscr)
+    elif key == 14:  # Ctrl+N
+        next_match()
+    elif key == 2:   # Ctrl+B
+        previous_match()
+    elif key == 20:  # Ctrl+T
+        toggle_hud()
+    elif key == 18:  # Ctrl+R
+        apply_ring_rules()
+    elif 32 <= key < 127:
+        ch = chr(key)
+        insert_char(ch)
+
+    return True
 
 # ---------------------------------------------------------------------
-# 7) MAIN
+# 7) HEADLESS SESSIONS
+# ---------------------------------------------------------------------
+KEY_NAMES = {
+    curses.KEY_UP: "UP", curses.KEY_DOWN: "DOWN",
+    curses.KEY_LEFT: "LEFT", curses.KEY_RIGHT: "RIGHT",
+    curses.KEY_BACKSPACE: "BACKSPACE", curses.KEY_ENTER: "KEY_ENTER",
+    10: "ENTER", 27: "ESC", 32: "SPACE", -1: "TICK",
+}
+for _n in range(1, 13):
+    KEY_NAMES[getattr(curses, f"KEY_F{_n}")] = f"F{_n}"
+KEY_CODES = {name: code for code, name in KEY_NAMES.items()}
+
+def key_name(key):
+    """
+    Script token for a key code (see parse_key_script).
+    """
+    if key in KEY_NAMES:
+        return KEY_NAMES[key]
+    if 1 <= key <= 26:
+        return "^" + chr(key + 64)
+    if 32 < key < 127:
+        return chr(key)
+    return f"KEY {key}"
+
+def parse_key_script(lines):
+    """
+    Parse a key script, one step per line:
+      - a single character is typed as-is (`+`, `-`, `X`, `#`...)
+      - names: UP, DOWN, LEFT, RIGHT, F1..F12, ENTER, ESC, BACKSPACE, SPACE
+      - `^X` is Ctrl+X, `TICK` is an idle frame, `KEY <n>` a raw key code
+      - `TEXT <chars>` types each character in turn
+    Blank lines and lines starting with "# " are ignored.
+    """
+    keys = []
+    for lineno, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+        token = line.strip()
+        if not token or line.startswith("# "):
+            continue
+        if len(token) == 1:
+            keys.append(ord(token))
+        elif token.startswith("TEXT "):
+            keys.extend(ord(ch) for ch in line.split("TEXT ", 1)[1])
+        elif token.startswith("KEY "):
+            keys.append(int(token.split()[1]))
+        elif len(token) == 2 and token[0] == "^" and "A" <= token[1].upper() <= "Z":
+            keys.append(ord(token[1].upper()) - 64)
+        elif token in KEY_CODES:
+            keys.append(KEY_CODES[token])
+        else:
+            raise ValueError(f"line {lineno}: unknown key {token!r}")
+    return keys
+
+class VirtualScreen:
+    """
+    In-memory stand-in for a curses window. Keys come from a script; once it
+    runs out getch returns Ctrl+D so the session ends deterministically.
+    Text past the right edge is clipped instead of wrapped.
+    """
+    def __init__(self, keys, height=40, width=120):
+        self.keys = deque(keys)
+        self.height = height
+        self.width = width
+        self.lines = [[' '] * width for _ in range(height)]
+        self.cy, self.cx = 0, 0
+
+    def getch(self):
+        return self.keys.popleft() if self.keys else 4
+
+    def getmaxyx(self):
+        return (self.height, self.width)
+
+    def addstr(self, y, x, text):
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error(f"addstr() out of bounds at ({y}, {x})")
+        row = self.lines[y]
+        for i, ch in enumerate(text[:self.width - x]):
+            row[x + i] = ch
+        self.cy, self.cx = y, min(x + len(text), self.width - 1)
+
+    def move(self, y, x):
+        self.cy, self.cx = y, x
+
+    def clrtoeol(self):
+        row = self.lines[self.cy]
+        row[self.cx:] = [' '] * (self.width - self.cx)
+
+    def erase(self):
+        for row in self.lines:
+            row[:] = [' '] * self.width
+
+    clear = erase
+
+    def refresh(self):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def timeout(self, delay):
+        pass
+
+    def dump(self):
+        return "\n".join("".join(row).rstrip() for row in self.lines)
+
+class RecordingScreen:
+    """
+    Wraps a curses window and logs every key it returns to `out`
+    in the parse_key_script format.
+    """
+    def __init__(self, stdscr, out):
+        self._stdscr = stdscr
+        self._out = out
+
+    def getch(self):
+        key = self._stdscr.getch()
+        self._out.write(key_name(key) + "\n")
+        return key
+
+    def __getattr__(self, name):
+        return getattr(self._stdscr, name)
+
+def run_headless(keys, height=40, width=120):
+    """
+    Replay `keys` through the normal dispatch logic against a VirtualScreen.
+    Returns (screen, step_times) with step_times as (key, seconds) pairs.
+    The HUD shows no timings or memory, so the final screen only depends
+    on the keys and arguments.
+    """
+    global hud_live
+    screen = VirtualScreen(keys, height, width)
+    step_times = []
+    hud_live = False
+    try:
+        session_loop(screen, step_times)
+    finally:
+        hud_live = True
+    return screen, step_times
+
+def report_step_times(step_times, out=sys.stdout):
+    if not step_times:
+        print("No steps.", file=out)
+        return
+    samples = sorted(t for _, t in step_times)
+    total = sum(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+    print(f"steps={len(samples)} total={total*1000:.1f}ms mean={total/len(samples)*1000:.2f}ms "
+          f"p50={pct(0.5):.2f}ms p99={pct(0.99):.2f}ms max={samples[-1]*1000:.2f}ms", file=out)
+
+# ---------------------------------------------------------------------
+# 8) MAIN
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
     # parse arguments
     save_file = None
     load_file = None
+    record_file = None
+    stream_file = None
+    bench_file = None
+    bench_compress_file = None
+    print_block = None
+    diff_files = None
+    render_only = False
+    cache_stats = False
+    merge_files = None
+    lazy_load = False
+    journal_enabled = False
+    full_save = False
+    replay_file = None
+    timings_file = None
 
     for arg in sys.argv:
         if arg.startswith('--save='):
             save_file = arg.split('=')[1]
         elif arg.startswith('--load='):
             load_file = arg.split('=')[1]
+        elif arg.startswith('--stream-prefill='):
+            stream_file = arg.split('=')[1]
+        elif arg.startswith('--record='):
+            record_file = arg.split('=')[1]
+        elif arg.startswith('--replay='):
+            replay_file = arg.split('=')[1]
+        elif arg.startswith('--timings='):
+            timings_file = arg.split('=')[1]
+        elif arg.startswith('--save-format='):
+            SAVE_FORMAT = arg.split('=')[1]
+            SAVE_FORMAT = int(SAVE_FORMAT) if SAVE_FORMAT.isdigit() else SAVE_FORMAT
+            check_save_format(SAVE_FORMAT)
+        elif arg.startswith('--bench-load='):
+            bench_file = arg.split('=')[1]
+        elif arg.startswith('--bench-compress='):
+            bench_compress_file = arg.split('=')[1]
+        elif arg.startswith('--compress='):
+            COMPRESSION = arg.split('=')[1]
+            check_compression(COMPRESSION)
+        elif arg == '--render':
+            render_only = True
+        elif arg == '--no-render-cache':
+            RENDER_CACHE = False
+        elif arg.startswith('--render-cache-mb='):
+            RENDER_CACHE_BYTES = int(arg.split('=')[1]) << 20
+        elif arg == '--render-cache-stats':
+            cache_stats = True
+        elif arg.startswith('--diff='):
+            diff_files = arg.split('=', 1)[1].split(',')
+            if len(diff_files) != 2:
+                raise ValueError("--diff needs two files: --diff=<old>,<new>")
+        elif arg.startswith('--merge='):
+            merge_files = arg.split('=', 1)[1].split(',')
+            if len(merge_files) != 3:
+                raise ValueError("--merge needs three files: --merge=<base>,<ours>,<theirs>")
+        elif arg.startswith('--print-block='):
+            print_block = arg.split('=')[1]
         elif arg.startswith('--prefill'):
             PREFILL = True
+        elif arg == '--preview':
+            preview_enabled = True
+        elif arg == '--hud':
+            hud_enabled = True
+        elif arg == '--lazy':
+            lazy_load = True
+        elif arg == '--journal':
+            journal_enabled = True
+        elif arg == '--full-save':
+            full_save = True
         elif arg.startswith('--mode='):
             FILL_MODE = arg.split('=')[1]
         elif arg.startswith('--shape='):
             SHAPE = arg.split('=')[1]
+        elif arg.startswith('--sampling='):
+            SAMPLING = arg.split('=')[1]
+            if SAMPLING not in SAMPLERS:
+                raise ValueError(f"unknown sampling {SAMPLING!r}, expected one of {SAMPLERS}")
+        elif arg.startswith('--seed='):
+            SEED = int(arg.split('=')[1])
+        elif arg.startswith('--layers='):
+            LAYERS = int(arg.split('=')[1])
+        elif arg.startswith('--workers='):
+            WORKERS = int(arg.split('=')[1])
+        elif arg.startswith('--load-workers='):
+            LOAD_WORKERS = int(arg.split('=')[1])
+        elif arg.startswith('--rule='):
+            RULE = arg.split('=', 1)[1]
+            RingRule(RULE)   # reject a bad spec before the UI starts
+        elif arg.startswith('--rule-char='):
+            RULE_CHAR = arg.split('=', 1)[1]
+            check_rule_char(RULE_CHAR)
+        elif arg.startswith('--rule-base='):
+            RULE_BASE = int(arg.split('=')[1])
+        elif arg.startswith('--rule-layers='):
+            RULE_LAYERS = int(arg.split('=')[1])
         elif arg.startswith('--fill') and '=' in arg:
             # Something like '--fillA=' or '--fillB='
             # e.g. '--fillA=A, , ,C'
             fill_key = arg.split('=')[0][6:]  # everything after '--fill'
-            fill_val_str = arg.split('=')[1]
-            fill_list = fill_val_str.split(',')
+            fill_val_str = arg.split('=', 1)[1]
+            if fill_val_str.startswith('@'):
+                # e.g. '--fillA=@1-10=cycle(AB.);11-=angle(XYZ)'
+                fill_list = FillPattern(fill_val_str[1:])
+            else:
+                fill_list = fill_val_str.split(',')
             # Store in FILLS dict if valid
             if fill_key in FILLS:
                 FILLS[fill_key] = fill_list
-            print(f"DEBUG: fill{fill_key} = {FILLS[fill_key]} (length={len(FILLS[fill_key])})")
+            print(f"DEBUG: fill{fill_key} = {FILLS[fill_key]} (length={fill_extent(FILLS[fill_key])})")
+
+    # reject a save that cannot be written before prefill or the UI starts
+    for target in (save_file, stream_file):
+        if target:
+            check_save_target(target, SAVE_FORMAT)
+
+    if stream_file:
+        # generate the world straight into a save file, no UI
+        stream_layers = LAYERS or max(fill_extent(fill) for fill in FILLS.values())
+        started = time.perf_counter()
+        size = stream_prefill_to_file(stream_file, FILL_MODE, FILLS, stream_layers, SEED, SAMPLING)
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {stream_layers} layers ({size / 1e6:.1f} MB) to {stream_file} "
+              f"in {elapsed:.2f}s ({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s).")
+        sys.exit(0)
+
+    if bench_file:
+        # time loading the same world from each save format, no UI
+        for version, size, parse, load in bench_load(bench_file):
+            print(f"format {version!s:>6}: {size / 1e6:8.2f} MB  parse {parse:.3f}s  load {load:.3f}s")
+        sys.exit(0)
+
+    if bench_compress_file:
+        # compression ratio and throughput of each codec on each save format, no UI
+        for version, codec, raw, packed, comp, decomp in bench_compress(bench_compress_file):
+            print(f"format {version!s:>6} {codec:>5}: {raw / 1e6:8.2f} MB -> {packed / 1e6:8.3f} MB "
+                  f"(x{raw / max(packed, 1):5.1f})  compress {raw / 1e6 / max(comp, 1e-9):7.1f} MB/s  "
+                  f"decompress {raw / 1e6 / max(decomp, 1e-9):7.1f} MB/s")
+        sys.exit(0)
+
+    if print_block:
+        # print one block of the --load file through its index, no UI
+        if not load_file:
+            raise ValueError("--print-block needs --load=<filename>")
+        layer, _, axiom = print_block.partition(':')
+        with SaveIndex(load_file) as index:
+            print("\n".join(index.rows(int(layer), axiom)))
+        sys.exit(0)
+
+    if cache_stats:
+        # what the render cache holds, no UI
+        evicted = evict_render_cache()
+        stats = render_cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        print(f"Render cache {RENDER_CACHE_DIR}: {stats['entries']} renders, "
+              f"{stats['bytes'] / (1 << 20):.1f} of {stats['limit'] / (1 << 20):.0f} MB"
+              + (f" ({evicted} evicted)" if evicted else ""))
+        print(f"{stats['hits']} hits, {stats['misses']} misses"
+              + (f" ({100 * stats['hits'] / lookups:.0f}% hit rate)" if lookups else ""))
+        sys.exit(0)
+
+    if diff_files:
+        # compare two saves block by block, no UI
+        diffs = diff_saves(*diff_files)
+        for layer, axiom, changes in diffs:
+            if isinstance(changes, str):
+                print(f"layer {layer} axiom {axiom}: {changes}")
+                continue
+            print(f"layer {layer} axiom {axiom}: {len(changes)} ring cells changed")
+            for i, old, new in changes[:DIFF_CELLS_SHOWN]:
+                print(f"  {i:6d}  {old!r} -> {new!r}")
+            if len(changes) > DIFF_CELLS_SHOWN:
+                print(f"  ... {len(changes) - DIFF_CELLS_SHOWN} more")
+        print(f"{len(diffs)} blocks differ.")
+        sys.exit(1 if diffs else 0)
+
+    if merge_files:
+        # three-way merge of saves into --save, no UI
+        if not save_file:
+            raise ValueError("--merge needs --save=<filename> for the result")
+        applied, conflicts = merge_saves(*merge_files)
+        for layer, axiom, i, what in conflicts:
+            where = f"ring cell {i}" if i is not None else "block"
+            print(f"conflict: layer {layer} axiom {axiom} {where}: {what} (kept ours)")
+        blocks = save_game_state(save_file, full=full_save)
+        print(f"Merged {applied} cells, {len(conflicts)} conflicts; saved {blocks} blocks to {save_file}.")
+        sys.exit(1 if conflicts else 0)
 
     # If --load is given, skip prefill
     if load_file and PREFILL:
@@ -628,30 +3748,72 @@ if __name__ == "__main__":
         PREFILL = False
 
     # load or prefill
-    if load_file:
+    if load_file and lazy_load:
+        # blocks are read on first use, see open_lazy
+        open_lazy(load_file)
+    elif load_file:
         load_game_state(load_file)
         # Re-apply read-only logic after loading
         reapply_read_only_inheritance()
+    if load_file:
+        # edits journaled after the last snapshot (e.g. a crashed session)
+        replayed = replay_journal(load_file)
+        if replayed:
+            print(f"Replayed {replayed} journaled edits onto {load_file}.")
     elif PREFILL:
         # each fill is passed individually
         prefill_layers(
             FILL_MODE,
             FILLS['A'], FILLS['B'], FILLS['C'],
             FILLS['D'], FILLS['E'], FILLS['F'],
-            FILLS['H'], FILLS['I'], FILLS['J']
+            FILLS['H'], FILLS['I'], FILLS['J'],
+            seed=SEED,
+            layers=range(1, LAYERS + 1) if LAYERS else None,
+            workers=WORKERS,
+            sampling=SAMPLING
         )
 
-    # run the curses UI
-    try:
-        curses.wrapper(run)
-        # after exiting the UI, do 3D rendering
+    if RULE and RULE_LAYERS:
+        # grow the layers above RULE_BASE with the ring rule
+        run_rules(RingRule(RULE, RULE_CHAR), RULE_BASE, RULE_LAYERS)
+
+    if journal_enabled:
+        if not (save_file or load_file):
+            raise ValueError("--journal needs --save=<filename> or --load=<filename>")
+        start_journal(save_file or load_file, load_file)
+
+    if replay_file:
+        # headless replay: same dispatch, in-memory screen, per-step timings
+        with open(replay_file, 'r', encoding='utf-8') as f:
+            script_keys = parse_key_script(f)
+        screen, step_times = run_headless(script_keys)
+        report_step_times(step_times)
+        if timings_file:
+            with open(timings_file, 'w', encoding='utf-8') as f:
+                for i, (key, seconds) in enumerate(step_times):
+                    f.write(f"{i}\t{key_name(key)}\t{seconds:.6f}\n")
+        screen_text = screen.dump()
+        screen_hash = hashlib.blake2b(screen_text.encode('utf-8'), digest_size=8).hexdigest()
+        print(f"Final screen ({screen_hash}):")
+        print(screen_text)
+    elif render_only:
+        # no UI, just the 3D export
         render_3d()
-    except KeyboardInterrupt:
-        pass
+    else:
+        # run the curses UI
+        try:
+            curses.wrapper(run, record_file)
+            # after exiting the UI, do 3D rendering
+            render_3d()
+        except KeyboardInterrupt:
+            pass
 
-    print("Exited.")
+        print("Exited.")
 
     # if we have --save=..., save the data
+    stop_journal()
     if save_file:
-        save_game_state(save_file)
-        print(f"Saved data to {save_file}.")
+        started = time.perf_counter()
+        blocks = save_game_state(save_file, full=full_save)
+        print(f"Saved {blocks} blocks to {save_file} in {time.perf_counter() - started:.3f}s.")
+        drop_journal(save_file)